@@ -1 +1 @@
-from .interface import Minotaur
\ No newline at end of file
+from .interface import Minotaur, enable, disable, is_enabled
\ No newline at end of file
@@ -0,0 +1,2 @@
+from .trace import TraceShape, TraceGenerator, generate
+from .suite import BENCHMARKS, benchmark, run, save, compare, load_results, footprint, Footprint
\ No newline at end of file
@@ -0,0 +1,324 @@
+from ..interface import Minotaur, load
+from ..interface.utility import load_messages, tangle
+from ..message import ContextGraph
+from ..catamorphism import Catamorphism, Algebra
+from ..utility.timer import Timer
+from .trace import TraceShape, generate
+
+from click.testing import CliRunner
+from dataclasses import dataclass
+from tempfile import TemporaryDirectory
+from typing import Callable, Iterable, List, Mapping, Optional, Tuple
+from os.path import join
+from json import dump, load as load_json
+from platform import python_version, platform
+from time import time
+from tracemalloc import start as start_tracing, stop as stop_tracing, get_traced_memory
+
+# Benchmarks are registered by name and report (elapsed seconds, operations performed)
+
+Benchmark = Callable[["Workspace"], Tuple[float, int]]
+
+BENCHMARKS = {}
+
+def benchmark(name : str) -> Callable[[Benchmark], Benchmark]:
+    """Register a benchmark under the given name."""
+
+    def register(function : Benchmark) -> Benchmark:
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+class Workspace:
+    """Scratch directory holding the synthetic trace shared by all benchmarks."""
+
+    def __init__(self, directory : str, shape : TraceShape, calls : int):
+        """Construct a workspace, generating the synthetic trace."""
+
+        self.directory = directory
+        self.shape = shape
+        self.calls = calls
+
+        self.trace = join(directory, "trace.log")
+        self.size = generate(self.trace, shape)
+
+    def path(self, name : str) -> str:
+        """Location of a scratch file in the workspace."""
+
+        return join(self.directory, name)
+
+    def minotaur(self, name : str) -> Minotaur:
+        """Construct a Minotaur object writing to a scratch log."""
+
+        return Minotaur(filepath=self.path(name))
+
+def close(minotaur : Minotaur):
+    """Release the handlers attached to a Minotaur object's logger."""
+
+    for handler in list(minotaur.logger.handlers):
+        handler.close()
+        minotaur.logger.removeHandler(handler)
+
+# Instrumentation overhead
+
+@benchmark("enter-exit")
+def enter_exit(workspace : Workspace) -> Tuple[float, int]:
+    minotaur = workspace.minotaur("enter-exit.log")
+
+    with Timer() as timer:
+        for _ in range(workspace.calls):
+            minotaur.enter("step")
+            minotaur.exit()
+
+    close(minotaur)
+    return timer.elapsed, workspace.calls
+
+@benchmark("emit")
+def emit(workspace : Workspace) -> Tuple[float, int]:
+    minotaur = workspace.minotaur("emit.log")
+
+    with Timer() as timer:
+        for index in range(workspace.calls):
+            minotaur.emit("value", index)
+
+    close(minotaur)
+    return timer.elapsed, workspace.calls
+
+@benchmark("emit-many")
+def emit_many(workspace : Workspace) -> Tuple[float, int]:
+    minotaur = workspace.minotaur("emit-many.log")
+
+    # operations are values emitted, so the result is comparable with `emit`
+    with Timer() as timer:
+        for index in range(workspace.calls):
+            minotaur.emit_many({"a" : index, "b" : index, "c" : index, "d" : index})
+
+    close(minotaur)
+    return timer.elapsed, workspace.calls * 4
+
+@benchmark("decorator")
+def decorator(workspace : Workspace) -> Tuple[float, int]:
+    minotaur = workspace.minotaur("decorator.log")
+
+    @minotaur("step", result="result", kwargs=["x"])
+    def step(x = 0):
+        return x
+
+    with Timer() as timer:
+        for index in range(workspace.calls):
+            step(x=index)
+
+    close(minotaur)
+    return timer.elapsed, workspace.calls
+
+# Analysis throughput, measured in messages
+
+@benchmark("load-messages")
+def load_messages_throughput(workspace : Workspace) -> Tuple[float, int]:
+    with Timer() as timer:
+        for _ in load_messages(workspace.trace):
+            pass
+
+    return timer.elapsed, workspace.size
+
+@benchmark("context-graph")
+def context_graph(workspace : Workspace) -> Tuple[float, int]:
+    messages = list(load_messages(workspace.trace))
+
+    with Timer() as timer:
+        graph = ContextGraph(messages)
+        for component in graph.components():
+            list(component)
+
+    return timer.elapsed, workspace.size
+
+@benchmark("tangle")
+def tangle_throughput(workspace : Workspace) -> Tuple[float, int]:
+    components = [list(component) for component in ContextGraph(load_messages(workspace.trace)).components()]
+
+    with Timer() as timer:
+        for component in components:
+            tangle(component)
+
+    return timer.elapsed, workspace.size
+
+@benchmark("catamorphism")
+def catamorphism(workspace : Workspace) -> Tuple[float, int]:
+    mazes = list(load(workspace.trace))
+    count = Catamorphism(Algebra(functor=lambda symbol, values, contexts: 1 + sum(contexts)))
+
+    with Timer() as timer:
+        for maze in mazes:
+            count(maze)
+
+    return timer.elapsed, workspace.size
+
+@benchmark("catamorphism-stream")
+def catamorphism_stream(workspace : Workspace) -> Tuple[float, int]:
+    count = Catamorphism(Algebra(functor=lambda symbol, values, contexts: 1 + sum(contexts)))
+
+    with Timer() as timer:
+        for _ in count.stream(load_messages(workspace.trace)):
+            pass
+
+    return timer.elapsed, workspace.size
+
+@benchmark("jsonl")
+def jsonl_command(workspace : Workspace) -> Tuple[float, int]:
+    from ..scripts import jsonl
+
+    with Timer() as timer:
+        result = CliRunner().invoke(jsonl, [workspace.trace, "--output", workspace.path("jsonl.out")])
+
+    if result.exception is not None:
+        raise result.exception
+    return timer.elapsed, workspace.size
+
+@benchmark("symbols")
+def symbols_command(workspace : Workspace) -> Tuple[float, int]:
+    from ..scripts import symbols
+
+    with Timer() as timer:
+        result = CliRunner().invoke(symbols, [workspace.trace])
+
+    if result.exception is not None:
+        raise result.exception
+    return timer.elapsed, workspace.size
+
+@benchmark("export")
+def export_command(workspace : Workspace) -> Tuple[float, int]:
+    from ..scripts import export
+
+    with Timer() as timer:
+        result = CliRunner().invoke(export, [workspace.trace, "--format", "chrome", "--output", workspace.path("export.json")])
+
+    if result.exception is not None:
+        raise result.exception
+    return timer.elapsed, workspace.size
+
+# Memory footprint of loaded traces
+
+@dataclass
+class Footprint:
+    """Memory held by the Mazes loaded from the synthetic trace."""
+
+    bytes : int
+    nodes : int
+    messages : int
+
+    @property
+    def per_node(self) -> float:
+        """Bytes per Maze node."""
+
+        return self.bytes / self.nodes
+
+    def dump(self):
+        """Convert the footprint to a JSON encoding."""
+
+        return {
+            "bytes" : self.bytes,
+            "nodes" : self.nodes,
+            "messages" : self.messages,
+            "per_node" : self.per_node
+        }
+
+def count_nodes(maze) -> int:
+    """Number of Maze nodes in a maze, including itself."""
+
+    return 1 + sum(count_nodes(branch) for branch in maze.branches)
+
+def footprint(shape : TraceShape) -> Footprint:
+    """Measure the memory retained by loading the synthetic trace into Mazes."""
+
+    with TemporaryDirectory() as directory:
+        workspace = Workspace(directory, shape, calls=0)
+
+        start_tracing()
+        mazes = list(load(workspace.trace))
+        retained, _ = get_traced_memory()
+        stop_tracing()
+
+        return Footprint(bytes=retained, nodes=sum(count_nodes(maze) for maze in mazes), messages=workspace.size)
+
+# Running and comparing
+
+@dataclass
+class Result:
+    """Best-of-`repeat` measurement of a single benchmark."""
+
+    name : str
+    seconds : float
+    operations : int
+
+    @property
+    def per_operation(self) -> float:
+        """Seconds per operation."""
+
+        return self.seconds / self.operations
+
+    def dump(self):
+        """Convert the result to a JSON encoding."""
+
+        return {
+            "seconds" : self.seconds,
+            "operations" : self.operations,
+            "per_operation" : self.per_operation
+        }
+
+def run(shape : TraceShape, calls : int = 10000, repeat : int = 3, names : Optional[Iterable[str]] = None) -> List[Result]:
+    """Run the selected benchmarks (all, by default), keeping the fastest of `repeat` runs."""
+
+    names = list(names) if names is not None else list(BENCHMARKS)
+    results = []
+
+    with TemporaryDirectory() as directory:
+        workspace = Workspace(directory, shape, calls)
+
+        for name in names:
+            measurements = [BENCHMARKS[name](workspace) for _ in range(repeat)]
+            seconds, operations = min(measurements)
+            results.append(Result(name=name, seconds=seconds, operations=operations))
+
+    return results
+
+def save(results : List[Result], shape : TraceShape, filepath : str, memory : Optional[Footprint] = None):
+    """Write benchmark results, along with the trace shape and environment, to a JSON file."""
+
+    contents = {
+        "time" : time(),
+        "python" : python_version(),
+        "platform" : platform(),
+        "shape" : shape.dump(),
+        "results" : {result.name : result.dump() for result in results}
+    }
+
+    if memory is not None:
+        contents["memory"] = memory.dump()
+
+    with open(filepath, "w") as f:
+        dump(contents, f, indent=2)
+
+def compare(baseline : Mapping, results : List[Result], threshold : float = 0.1) -> List[Tuple[str, float]]:
+    """Return the (name, relative slowdown) of every benchmark more than `threshold` slower than in `baseline`.
+
+    `baseline` is the contents of a file written by `save`; benchmarks missing from it are ignored."""
+
+    regressions = []
+
+    for result in results:
+        try:
+            reference = baseline["results"][result.name]["per_operation"]
+        except KeyError:
+            continue
+
+        slowdown = result.per_operation / reference - 1
+        if slowdown > threshold:
+            regressions.append((result.name, slowdown))
+
+    return regressions
+
+def load_results(filepath : str) -> Mapping:
+    """Read benchmark results written by `save`."""
+
+    with open(filepath, "r") as f:
+        return load_json(f)
@@ -0,0 +1,103 @@
+from ..maze import Identifier
+from ..message import Message, Enter, Exit, Emit
+
+from dataclasses import dataclass, asdict
+from random import Random
+from typing import Iterable
+
+# Synthetic traces with a configurable shape
+
+@dataclass
+class TraceShape:
+    """Shape of a synthetic trace.
+
+    Every root holds a complete tree of contexts `depth` levels deep, where each context has `fanout` sub-contexts and emits `emits` values."""
+
+    depth : int = 4
+    fanout : int = 4
+    emits : int = 2
+    roots : int = 8
+    seed : int = 0
+
+    @property
+    def contexts(self) -> int:
+        """Number of contexts in the trace."""
+
+        return self.roots * sum(self.fanout ** level for level in range(self.depth))
+
+    @property
+    def size(self) -> int:
+        """Number of messages in the trace."""
+
+        return self.contexts * (2 + self.emits)
+
+    def dump(self):
+        """Convert the shape to a JSON encoding."""
+
+        return asdict(self)
+
+class TraceGenerator:
+    """Produces the messages of a synthetic trace in log order."""
+
+    def __init__(self, shape : TraceShape):
+        """Construct a trace generator."""
+
+        self.shape = shape
+        self.random = Random(shape.seed)
+        self.time = 0.0
+        self.count = 0
+        self.sequence = 0
+        self.writer = None
+
+    def tick(self) -> float:
+        """Advance and return the synthetic clock."""
+
+        self.time += self.random.expovariate(1e6)
+        return self.time
+
+    def stamp(self):
+        """Writer id and next sequence number for a message."""
+
+        self.sequence += 1
+        return {"sequence" : self.sequence, "writer" : self.writer}
+
+    def identifier(self, symbol : str) -> Identifier:
+        """Construct an identifier with a key unique to the trace."""
+
+        self.count += 1
+        return Identifier(symbol, key=str(self.count))
+
+    def context(self, parent : Identifier, level : int) -> Iterable[Message]:
+        """Yield the messages of a context and all its sub-contexts."""
+
+        identifier = self.identifier(f"level-{level}")
+        yield Enter(identifier=identifier, context=parent, timestamp=self.tick(), **self.stamp())
+
+        for index in range(self.shape.emits):
+            value = self.random.random()
+            yield Emit(value=value, identifier=self.identifier(f"value-{index}"), context=identifier, timestamp=self.tick(), **self.stamp())
+
+        if level + 1 < self.shape.depth:
+            for _ in range(self.shape.fanout):
+                yield from self.context(identifier, level + 1)
+
+        yield Exit(identifier=identifier, context=parent, timestamp=self.tick(), **self.stamp())
+
+    def messages(self) -> Iterable[Message]:
+        """Yield every message in the trace. Each root is written by its own writer."""
+
+        for index in range(self.shape.roots):
+            self.writer = f"synthetic-{index}"
+            yield from self.context(self.identifier("root"), 0)
+
+def generate(filepath : str, shape : TraceShape) -> int:
+    """Write a synthetic trace to `filepath`. Returns the number of messages written."""
+
+    count = 0
+
+    with open(filepath, "w") as f:
+        for message in TraceGenerator(shape).messages():
+            f.write(f"{message}\n")
+            count += 1
+
+    return count
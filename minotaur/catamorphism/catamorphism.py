@@ -1,5 +1,7 @@
 from ..maze import Identifier, Maze
-from typing import Generic, TypeVar, Mapping, Tuple, Iterable, Optional, Callable, Any
+from ..message import Message, Enter, Exit, Emit, Batch, Instance
+from ..interface import is_value, is_context
+from typing import Generic, TypeVar, Mapping, Tuple, Iterable, Optional, Callable, Any, Dict
 
 # Many of the constructions here are polymorphic wrt the result
 
@@ -66,7 +68,7 @@ class Algebra(Generic[T]):
         """Evaluate the algebra."""
 
         try:
-            return self.switch[symbol](values, contexts)
+            return self.cases[symbol](values, contexts)
         except KeyError:
             if self.functor:
                 return self.functor(symbol, values, contexts)
@@ -89,9 +91,8 @@ class ProductAlgebra(Algebra[Tuple]):
     def project(self, contexts : ContextMap) -> Tuple[ContextMap]:
         """Map a context map of tuples to a tuple of context maps."""
 
-        mappings = (dict(zip(contexts.map, values)) for values in zip(*contexts.map.values()))
-        contexts = (ContextMap(mapping) for mapping in mappings)
-        return tuple(contexts)
+        mappings = ({context : result[index] for context, result in contexts.map.items()} for index in range(len(self.algebras)))
+        return tuple(ContextMap(mapping) for mapping in mappings)
 
     def evaluate(self, symbol : str, values : Mapping[str, Any], contexts : ContextMap) -> Tuple:
         """Evaluate the algebra."""
@@ -116,14 +117,52 @@ class Catamorphism(Generic[T]):
         """Simple recursive evaluation of a Yarn object in the catamorphism."""
 
         # build value map (w/special value duration)
-        values = {value.name : value.value for value in yarn.values}
-        values["duration"] = yarn.duration
+        values = {value.symbol : value.value for value in yarn.mazes() if is_value(value)}
+        values["duration"] = yarn.value.duration
 
         # build context map <- where all the recursion happens
-        context_map = {context.identifier : self.evaluate(context) for context in yarn.contexts}
+        context_map = {context.identifier : self.evaluate(context) for context in yarn.mazes() if is_context(context)}
 
         # and evaluate the current level
-        return self.algebra(yarn.symbol, values, context_map)
+        return self.algebra(yarn.symbol, values, ContextMap(context_map))
+
+    def stream(self, messages : Iterable[Message]) -> Iterable[T]:
+        """Evaluate directly on a message stream, yielding the result of each root context as it exits.
+
+        Each context holds only its values and the results of its completed sub-contexts, which are discarded once it exits, so memory is proportional to the number of open contexts."""
+
+        # identifier -> (start time, values, sub-context results) for every context entered but not yet exited
+        open : Dict[Identifier, Tuple[float, Dict[str, Any], Dict[Identifier, T]]] = {}
+
+        def consume(message : Message) -> Iterable[T]:
+            if isinstance(message, Enter):
+                open[message.identifier] = (message.timestamp, {}, {})
+
+            elif isinstance(message, Emit):
+                # values outside any entered context belong to no maze, as in `tangle`
+                if message.context in open:
+                    open[message.context][1][message.identifier.symbol] = message.value
+
+            elif isinstance(message, Exit):
+                try:
+                    start, values, context_map = open.pop(message.identifier)
+                except KeyError:
+                    return
+
+                values["duration"] = message.timestamp - start
+                result = self.algebra(message.identifier.symbol, values, ContextMap(context_map))
+
+                if message.context in open:
+                    open[message.context][2][message.identifier] = result
+                else:
+                    yield result
+
+            elif isinstance(message, (Batch, Instance)):
+                for expanded in message.messages():
+                    yield from consume(expanded)
+
+        for message in messages:
+            yield from consume(message)
 
     # Dunder methods for easier interfacing
 
@@ -1,2 +1,6 @@
-from .minotaur import Minotaur
-from .utility import load, Timestamp, is_context, is_value
\ No newline at end of file
+from .minotaur import Minotaur, enable, disable, is_enabled
+from .utility import load, Timestamp, is_context, is_value
+from .lazy import load_lazy, LazyMaze, MazeIndex
+from .hierarchy import Hierarchy
+from .follow import LogFollower
+from .database import TraceDatabase
\ No newline at end of file
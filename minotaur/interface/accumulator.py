@@ -0,0 +1,86 @@
+from typing import Any, Dict, Type
+
+# Accumulators collect values in memory and are emitted once, when their context exits
+
+class Accumulator:
+    """Named value built up over the lifetime of a context."""
+
+    __slots__ = ("name", "value")
+
+    def __init__(self, name : str):
+        """Construct an empty accumulator."""
+
+        self.name = name
+        self.value = self.initial()
+
+    def initial(self) -> Any:
+        """The value of an accumulator before anything is added."""
+
+        return None
+
+    def add(self, value : Any):
+        """Incorporate a single value."""
+
+        raise NotImplementedError(f"Accumulator {self} has no `add` method.")
+
+    def __repr__(self):
+        return f"{type(self).__name__}(name={self.name!r}, value={self.value!r})"
+
+class Counter(Accumulator):
+    """Counts occurrences, or sums integer increments."""
+
+    __slots__ = ()
+
+    def initial(self) -> int:
+        return 0
+
+    def add(self, value : int = 1):
+        self.value += value
+
+class Sum(Accumulator):
+    """Sums the added values."""
+
+    __slots__ = ()
+
+    def initial(self) -> float:
+        return 0
+
+    def add(self, value : float):
+        self.value += value
+
+class Min(Accumulator):
+    """Keeps the smallest added value."""
+
+    __slots__ = ()
+
+    def add(self, value : Any):
+        if self.value is None or value < self.value:
+            self.value = value
+
+class Max(Accumulator):
+    """Keeps the largest added value."""
+
+    __slots__ = ()
+
+    def add(self, value : Any):
+        if self.value is None or value > self.value:
+            self.value = value
+
+class Collect(Accumulator):
+    """Keeps every added value, in order."""
+
+    __slots__ = ()
+
+    def initial(self) -> list:
+        return []
+
+    def add(self, value : Any):
+        self.value.append(value)
+
+ACCUMULATORS : Dict[str, Type[Accumulator]] = {
+    "counter" : Counter,
+    "sum" : Sum,
+    "min" : Min,
+    "max" : Max,
+    "list" : Collect
+}
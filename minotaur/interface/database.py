@@ -0,0 +1,308 @@
+from ..maze import Maze, Identifier
+from ..message import Message, Enter, Exit, Emit, Batch, Instance, Blob, ValueStore, TemplateTable
+from ..message.message import freeze
+from .utility import Timestamp
+
+from sqlite3 import connect, Row
+from collections import defaultdict
+from json import loads, dumps
+from os.path import abspath, getsize
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# bumped whenever the schema changes; databases written with an older schema are discarded and rebuilt empty
+VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    ordinal INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS contexts (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs(id),
+    parent INTEGER REFERENCES contexts(id),
+    root INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    key TEXT NOT NULL,
+    start REAL NOT NULL,
+    stop REAL,
+    duration REAL,
+    ordinal INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS "values" (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs(id),
+    context INTEGER REFERENCES contexts(id),
+    symbol TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    timestamp REAL NOT NULL,
+    ordinal INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS templates (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    writer TEXT,
+    template INTEGER NOT NULL,
+    shape TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS contexts_symbol ON contexts (symbol, duration);
+CREATE INDEX IF NOT EXISTS contexts_parent ON contexts (parent);
+CREATE INDEX IF NOT EXISTS contexts_root ON contexts (root);
+CREATE INDEX IF NOT EXISTS contexts_open ON contexts (run, stop);
+CREATE INDEX IF NOT EXISTS values_context ON "values" (context);
+CREATE INDEX IF NOT EXISTS values_symbol ON "values" (symbol);
+"""
+
+# Indexing a single log, resuming wherever the previous pass stopped
+
+class RunIndexer:
+    """Streams the unread portion of one log into the database, batching inserts."""
+
+    def __init__(self, database : "TraceDatabase", run : int, path : str, position : int, ordinal : int, batch : int):
+        """Construct an indexer, restoring the open contexts and shapes left by earlier passes."""
+
+        self.database = database
+        self.connection = database.connection
+        self.run = run
+        self.path = path
+        self.position = position
+        self.batch = batch
+
+        # each (expanded) message is numbered in log order; sibling contexts and values are ordered by it, as `load` orders them
+        self.ordinal = ordinal
+
+        self.next_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM contexts").fetchone()[0]
+
+        # identifier -> (id, root, start) for contexts entered but not yet exited
+        self.open : Dict[Identifier, Tuple[int, int, float]] = {}
+        for id, root, symbol, key, start in self.connection.execute(
+            "SELECT id, root, symbol, key, start FROM contexts WHERE run = ? AND stop IS NULL", (run,)
+        ):
+            self.open[Identifier(symbol, key=key)] = (id, root, start)
+
+        self.templates = TemplateTable()
+        for writer, template, shape in self.connection.execute(
+            "SELECT writer, template, shape FROM templates WHERE run = ?", (run,)
+        ):
+            self.templates.shapes[(writer, template)] = freeze(loads(shape))
+
+        # pending writes; context rows stay mutable until flushed so an exit can complete them in place
+        self.contexts : Dict[int, list] = {}
+        self.values : List[tuple] = []
+        self.stops : List[tuple] = []
+        self.shapes : List[tuple] = []
+
+    def add(self, message : Message):
+        """Stage the rows for a single message."""
+
+        ordinal = self.ordinal
+        if not isinstance(message, (Batch, Instance)):
+            self.ordinal += 1
+
+        if isinstance(message, Enter):
+            try:
+                parent, root, _ = self.open[message.context]
+            except KeyError:
+                parent, root = None, self.next_id
+
+            id, self.next_id = self.next_id, self.next_id + 1
+            self.contexts[id] = [id, self.run, parent, root, message.identifier.symbol, message.identifier.key, message.timestamp, None, None, ordinal]
+            self.open[message.identifier] = (id, root, message.timestamp)
+
+        elif isinstance(message, Exit):
+            try:
+                id, _, start = self.open.pop(message.identifier)
+            except KeyError:
+                return
+
+            # a context takes its place among its siblings when it exits
+            duration = message.timestamp - start
+            if id in self.contexts:
+                self.contexts[id][7:] = [message.timestamp, duration, ordinal]
+            else:
+                self.stops.append((message.timestamp, duration, ordinal, id))
+
+        elif isinstance(message, Emit):
+            context = self.open.get(message.context, (None,))[0]
+            value = dumps(message.value, default=Blob.dump)
+            self.values.append((self.run, context, message.identifier.symbol, message.identifier.key, value, message.timestamp, ordinal))
+
+        elif isinstance(message, (Batch, Instance)):
+            for expanded in message.messages():
+                self.add(expanded)
+
+        if len(self.contexts) + len(self.values) + len(self.stops) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        """Write all staged rows."""
+
+        # inserts first, so stops for contexts entered earlier in this pass find their rows
+        self.connection.executemany("INSERT INTO contexts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self.contexts.values())
+        self.connection.executemany("UPDATE contexts SET stop = ?, duration = ?, ordinal = ? WHERE id = ?", self.stops)
+        self.connection.executemany(
+            'INSERT INTO "values" (run, context, symbol, key, value, timestamp, ordinal) VALUES (?, ?, ?, ?, ?, ?, ?)', self.values
+        )
+        self.connection.executemany("INSERT INTO templates VALUES (?, ?, ?, ?)", self.shapes)
+
+        self.contexts, self.values, self.stops, self.shapes = {}, [], [], []
+
+    def index(self) -> int:
+        """Index every complete line after the stored position. Returns the number of messages indexed."""
+
+        count = 0
+
+        with open(self.path, "rb") as log:
+            log.seek(self.position)
+
+            for line in log:
+                # a partially-written final line is left for the next pass
+                if not line.endswith(b"\n"):
+                    break
+
+                message = Message.load(loads(line))
+
+                if isinstance(message, Instance) and message.shape is not None:
+                    self.shapes.append((self.run, message.writer, message.template, dumps(message.shape)))
+
+                self.add(self.templates.resolve(message))
+                self.position += len(line)
+                count += 1
+
+        self.flush()
+        self.connection.execute("UPDATE runs SET position = ?, ordinal = ? WHERE id = ?", (self.position, self.ordinal, self.run))
+        return count
+
+# Databases hold any number of indexed logs
+
+class TraceDatabase:
+    """SQLite index of message logs.
+
+    Contexts are stored with their parent, root, symbol, key, start, stop, duration, and the log (run) they came from; emitted values are stored as JSON alongside their context. Both carry an `ordinal`, the position in the run's log of the value's Emit or the context's Exit, which orders them among their siblings."""
+
+    def __init__(self, filepath : str):
+        """Open (and, if needed, create) a trace database. A database written with an older schema is emptied, so its logs must be indexed again."""
+
+        self.filepath = filepath
+        self.connection = connect(filepath)
+
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != VERSION:
+            with self.connection:
+                for table in ("templates", '"values"', "contexts", "runs"):
+                    self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                self.connection.execute(f"PRAGMA user_version = {VERSION}")
+
+        self.connection.executescript(SCHEMA)
+
+    # Indexing
+
+    def run(self, path : str) -> Tuple[int, int, int]:
+        """Return the id of the run for a log, the byte position indexed so far, and the next message ordinal, registering it if needed."""
+
+        path = abspath(path)
+        self.connection.execute("INSERT OR IGNORE INTO runs (path) VALUES (?)", (path,))
+        return self.connection.execute("SELECT id, position, ordinal FROM runs WHERE path = ?", (path,)).fetchone()
+
+    def forget(self, run : int):
+        """Remove everything indexed for a run."""
+
+        for table in ("contexts", '"values"', "templates"):
+            self.connection.execute(f"DELETE FROM {table} WHERE run = ?", (run,))
+        self.connection.execute("UPDATE runs SET position = 0, ordinal = 0 WHERE id = ?", (run,))
+
+    def index(self, path : str, batch : int = 10000) -> int:
+        """Index everything appended to a log since it was last indexed, in a single transaction. Returns the number of messages indexed.
+
+        A log that has shrunk since it was last indexed is assumed to have been replaced, and is indexed from scratch."""
+
+        with self.connection:
+            run, position, ordinal = self.run(path)
+
+            if getsize(path) < position:
+                self.forget(run)
+                position, ordinal = 0, 0
+
+            return RunIndexer(self, run, path, position, ordinal, batch).index()
+
+    # Querying
+
+    def execute(self, sql : str, *parameters) -> List[Row]:
+        """Run an arbitrary query, returning rows addressable by column name."""
+
+        self.connection.row_factory = Row
+        try:
+            return self.connection.execute(sql, parameters).fetchall()
+        finally:
+            self.connection.row_factory = None
+
+    def maze(self, id : int) -> Maze:
+        """Reconstruct the Maze rooted at the context with the given id."""
+
+        contexts = self.connection.execute("""
+            WITH RECURSIVE subtree(id) AS (
+                SELECT ? UNION ALL SELECT contexts.id FROM contexts JOIN subtree ON contexts.parent = subtree.id
+            )
+            SELECT contexts.id, contexts.parent, contexts.symbol, contexts.key, contexts.start, contexts.stop, contexts.ordinal, runs.path
+            FROM contexts JOIN subtree ON contexts.id = subtree.id JOIN runs ON contexts.run = runs.id
+            ORDER BY contexts.id
+        """, (id,)).fetchall()
+
+        if not contexts:
+            raise KeyError(f"No context with id {id}.")
+
+        store = ValueStore.for_log(contexts[0][7])
+        ids = [row[0] for row in contexts]
+        branches = defaultdict(list)
+
+        # branches are collected as (ordinal, maze) and interleaved once every context is built
+        for chunk in range(0, len(ids), 500):
+            selected = ids[chunk:chunk + 500]
+            for context, symbol, key, value, ordinal in self.connection.execute(
+                f'SELECT context, symbol, key, value, ordinal FROM "values" WHERE context IN ({", ".join("?" * len(selected))})',
+                selected
+            ):
+                maze = Maze(identifier=Identifier(symbol, key=key), value=self.load_value(value, store), branches=[])
+                branches[context].append((ordinal, maze))
+
+        # contexts are numbered as they are entered, so parents always precede their children
+        mazes = {}
+        for context, parent, symbol, key, start, stop, ordinal, _ in contexts:
+            timestamp = Timestamp(start=start, stop=stop if stop is not None else start)
+            mazes[context] = Maze(identifier=Identifier(symbol, key=key), value=timestamp, branches=[])
+            if context != id:
+                branches[parent].append((ordinal, mazes[context]))
+
+        for context, maze in mazes.items():
+            maze.branches = [branch for _, branch in sorted(branches[context], key=lambda pair: pair[0])]
+
+        return mazes[id]
+
+    def mazes(self, ids : Iterable[int]) -> Iterable[Maze]:
+        """Reconstruct the Mazes rooted at each of the given context ids."""
+
+        for id in ids:
+            yield self.maze(id)
+
+    @staticmethod
+    def load_value(value : Optional[str], store : ValueStore) -> Any:
+        """Decode a stored value, binding blob references to the run's value store."""
+
+        value = loads(value) if value is not None else None
+
+        if Blob.is_blob(value):
+            blob = Blob.load(value)
+            blob.store = store
+            return blob
+
+        return value
+
+    def close(self):
+        """Close the database connection."""
+
+        self.connection.close()
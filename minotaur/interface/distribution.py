@@ -0,0 +1,162 @@
+from .hierarchy import Hierarchy, HierarchyNode
+from .utility import load_messages
+
+from dataclasses import dataclass
+from math import ceil, log
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Distributions summarize durations in memory independent of how many were seen
+
+class Distribution:
+    """Streaming summary of a set of durations.
+
+    Durations are counted in logarithmically-sized buckets, so quantiles are estimated to within `ACCURACY` relative error while memory grows only with the spread of the durations."""
+
+    __slots__ = ("count", "total", "minimum", "maximum", "zeros", "buckets")
+
+    ACCURACY = 0.01
+    GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    LOG_GAMMA = log(GAMMA)
+
+    def __init__(self):
+        """Construct an empty distribution."""
+
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+        self.zeros = 0
+        self.buckets : Dict[int, int] = {}
+
+    @property
+    def mean(self) -> float:
+        """Mean of the summarized durations."""
+
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, duration : float):
+        """Account for a single duration."""
+
+        self.count += 1
+        self.total += duration
+        self.minimum = min(self.minimum, duration)
+        self.maximum = max(self.maximum, duration)
+
+        if duration <= 0:
+            self.zeros += 1
+        else:
+            bucket = ceil(log(duration) / self.LOG_GAMMA)
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def quantile(self, q : float) -> float:
+        """Estimate the `q`-quantile of the summarized durations."""
+
+        if not self.count:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if rank < seen:
+                estimate = 2 * self.GAMMA ** bucket / (self.GAMMA + 1)
+                return min(max(estimate, self.minimum), self.maximum)
+
+        return self.maximum
+
+class DistributionHierarchy(Hierarchy):
+    """Symbol hierarchy that also summarizes the distribution of durations of each path."""
+
+    def __init__(self, messages = None):
+        """Construct a hierarchy, consuming `messages` if provided."""
+
+        self.distributions : Dict[HierarchyNode, Distribution] = {}
+        super().__init__(messages)
+
+    def record(self, node : HierarchyNode, duration : float):
+        super().record(node, duration)
+
+        try:
+            self.distributions[node].add(duration)
+        except KeyError:
+            distribution = self.distributions[node] = Distribution()
+            distribution.add(duration)
+
+    def summary(self) -> Dict[Tuple[str, ...], Distribution]:
+        """Map each symbol path to the distribution of its durations."""
+
+        return {node.path : distribution for node, distribution in self.distributions.items()}
+
+def summarize(filepath : str) -> Dict[Tuple[str, ...], Distribution]:
+    """Stream a message log, summarizing the durations of every symbol path."""
+
+    return DistributionHierarchy(load_messages(filepath)).summary()
+
+# Comparing summaries
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+@dataclass
+class Change:
+    """Difference between the durations of a symbol path in two logs."""
+
+    path : Tuple[str, ...]
+    baseline : Distribution
+    candidate : Distribution
+    quantiles : Tuple[float, ...] = QUANTILES
+
+    @property
+    def impact(self) -> float:
+        """Difference in total time spent on the path."""
+
+        return self.candidate.total - self.baseline.total
+
+    def relative(self) -> Dict[str, Optional[float]]:
+        """Relative change of each compared statistic, or `None` where the baseline is zero."""
+
+        def ratio(before : float, after : float) -> Optional[float]:
+            if before == 0:
+                return None if after else 0.0
+            return after / before - 1
+
+        changes = {
+            "count" : ratio(self.baseline.count, self.candidate.count),
+            "total" : ratio(self.baseline.total, self.candidate.total)
+        }
+
+        for q in self.quantiles:
+            changes[f"p{q * 100:g}"] = ratio(self.baseline.quantile(q), self.candidate.quantile(q))
+
+        return changes
+
+    def exceeds(self, threshold : float) -> bool:
+        """True iff any compared statistic changed by more than `threshold` (relative), or the path is new or missing."""
+
+        return any(change is None or abs(change) > threshold for change in self.relative().values())
+
+def diff(
+    baseline : Dict[Tuple[str, ...], Distribution],
+    candidate : Dict[Tuple[str, ...], Distribution],
+    threshold : float = 0.1,
+    quantiles : Iterable[float] = QUANTILES
+) -> List[Change]:
+    """Return the changes of every path whose statistics moved by more than `threshold`, largest impact first."""
+
+    quantiles = tuple(quantiles)
+    changes = []
+
+    for path in baseline.keys() | candidate.keys():
+        change = Change(
+            path=path,
+            baseline=baseline.get(path, Distribution()),
+            candidate=candidate.get(path, Distribution()),
+            quantiles=quantiles
+        )
+
+        if change.exceeds(threshold):
+            changes.append(change)
+
+    return sorted(changes, key=lambda change: abs(change.impact), reverse=True)
@@ -0,0 +1,64 @@
+from ..message import Message, ValueStore, TemplateTable
+
+from typing import List, Optional
+from json import loads
+from os.path import getsize
+
+# Followers read only the bytes appended to a log since they last looked
+
+class LogFollower:
+    """Incrementally reads messages from a log that is still being written."""
+
+    CHUNK = 1 << 20
+
+    def __init__(self, filepath : str, position : int = 0):
+        """Construct a follower, starting at byte `position` of the log."""
+
+        self.filepath = filepath
+        self.position = position
+        self.remainder = b""
+        self.store = ValueStore.for_log(filepath)
+        self.templates = TemplateTable()
+
+    def truncated(self) -> bool:
+        """True iff the log is now shorter than what has already been read, e.g. after being rotated."""
+
+        return getsize(self.filepath) < self.position
+
+    def reset(self):
+        """Start reading again from the beginning of the log."""
+
+        self.position = 0
+        self.remainder = b""
+        self.templates = TemplateTable()
+
+    def lagging(self) -> bool:
+        """True iff the log holds bytes that have not been read yet."""
+
+        return getsize(self.filepath) > self.position
+
+    def poll(self, limit : Optional[int] = 1 << 24) -> List[Message]:
+        """Return the complete messages appended since the last poll.
+
+        The log is read in chunks of `CHUNK` bytes, stopping after `limit` bytes (or at the end of the log, if `limit` is `None`), so catching up on a large log takes several polls rather than one large read."""
+
+        messages = []
+
+        with open(self.filepath, "rb") as f:
+            f.seek(self.position)
+
+            consumed = 0
+            while limit is None or consumed < limit:
+                size = self.CHUNK if limit is None else min(self.CHUNK, limit - consumed)
+                contents = f.read(size)
+                if not contents:
+                    break
+
+                consumed += len(contents)
+                self.position += len(contents)
+
+                # the final line may still be mid-write; hold on to it until it is complete
+                *lines, self.remainder = (self.remainder + contents).split(b"\n")
+                messages.extend(self.templates.resolve(self.store.attach(Message.load(loads(line)))) for line in lines if line)
+
+        return messages
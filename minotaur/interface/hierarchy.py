@@ -0,0 +1,123 @@
+from ..maze import Identifier
+from ..message import Message, Enter, Exit, Emit, Batch, Instance
+
+from typing import Dict, Iterable, Optional, Tuple
+
+# Symbol hierarchies aggregate every context sharing a symbol path
+
+class HierarchyNode:
+    """Aggregate of all contexts (or values) reached by the same path of symbols."""
+
+    __slots__ = ("symbol", "parent", "count", "total", "contexts", "values")
+
+    def __init__(self, symbol : str, parent : Optional["HierarchyNode"] = None):
+        """Construct an empty hierarchy node."""
+
+        self.symbol = symbol
+        self.parent = parent
+        self.count = 0
+        self.total = 0.0
+        self.contexts : Dict[str, "HierarchyNode"] = {}
+        self.values : Dict[str, "HierarchyNode"] = {}
+
+    @property
+    def mean(self) -> float:
+        """Mean duration of the aggregated contexts."""
+
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def path(self) -> Tuple[str, ...]:
+        """Symbols from the top of the hierarchy down to this node, excluding the root."""
+
+        path, node = [], self
+        while node.parent is not None:
+            path.append(node.symbol)
+            node = node.parent
+        return tuple(reversed(path))
+
+    def context(self, symbol : str) -> "HierarchyNode":
+        """Return the sub-context node with the given symbol, constructing it if needed."""
+
+        try:
+            return self.contexts[symbol]
+        except KeyError:
+            node = self.contexts[symbol] = HierarchyNode(symbol, parent=self)
+            return node
+
+    def value(self, symbol : str) -> "HierarchyNode":
+        """Return the value node with the given symbol, constructing it if needed."""
+
+        try:
+            return self.values[symbol]
+        except KeyError:
+            node = self.values[symbol] = HierarchyNode(symbol, parent=self)
+            return node
+
+    def walk(self, path : Tuple[str, ...] = ()) -> Iterable[Tuple[Tuple[str, ...], "HierarchyNode"]]:
+        """Yield every context node below this one, along with its symbol path."""
+
+        for symbol, node in self.contexts.items():
+            yield path + (symbol,), node
+            yield from node.walk(path + (symbol,))
+
+class Hierarchy:
+    """Streaming aggregation of a message log into a single tree keyed by symbol path.
+
+    Messages are consumed one at a time in log order, so memory is proportional to the number of distinct paths and open contexts rather than to the size of the log."""
+
+    def __init__(self, messages : Optional[Iterable[Message]] = None):
+        """Construct a hierarchy, consuming `messages` if provided."""
+
+        self.root = HierarchyNode("root")
+
+        # identifier -> (node, start time) for every context entered but not yet exited
+        self.open : Dict[Identifier, Tuple[HierarchyNode, float]] = {}
+
+        if messages is not None:
+            self.extend(messages)
+
+    def parent(self, context : Identifier) -> HierarchyNode:
+        """The node of an open context, or the root if the context is unknown."""
+
+        try:
+            return self.open[context][0]
+        except KeyError:
+            return self.root
+
+    def update(self, message : Message):
+        """Incorporate a single message."""
+
+        if isinstance(message, Enter):
+            node = self.parent(message.context).context(message.identifier.symbol)
+            self.open[message.identifier] = (node, message.timestamp)
+
+        elif isinstance(message, Exit):
+            try:
+                node, start = self.open.pop(message.identifier)
+            except KeyError:
+                return
+            self.record(node, message.timestamp - start)
+
+        elif isinstance(message, Emit):
+            self.parent(message.context).value(message.identifier.symbol).count += 1
+
+        elif isinstance(message, (Batch, Instance)):
+            self.extend(message.messages())
+
+    def record(self, node : HierarchyNode, duration : float):
+        """Account for a completed context. Subclasses may extend this to track further statistics."""
+
+        node.count += 1
+        node.total += duration
+
+    def extend(self, messages : Iterable[Message]):
+        """Incorporate a sequence of messages."""
+
+        for message in messages:
+            self.update(message)
+
+    def paths(self) -> Iterable[Tuple[Tuple[str, ...], HierarchyNode]]:
+        """Yield every context node, along with its symbol path."""
+
+        yield from self.root.walk()
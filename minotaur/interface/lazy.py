@@ -0,0 +1,220 @@
+from ..maze import Maze, Identifier
+from ..message import Message, Enter, Exit, Emit, Batch, Instance, ValueStore, TemplateTable
+from ..message.message import freeze
+from .utility import Timestamp, TemplatedMaze
+
+from typing import Iterable, List, Tuple, Optional, Any, Union, TypeVar
+from collections import OrderedDict, defaultdict
+from dataclasses import replace
+from json import loads, dumps
+from os import replace as replace_file
+from os.path import exists, getsize
+
+T = TypeVar("T")
+
+# Sidecar indices store one record per closed context, written in exit order
+
+class MazeIndex:
+    """Byte-offset index over a message log, used to materialize Maze nodes on demand.
+
+    The index lives next to the log (at `<filepath>.index` by default) and is rebuilt whenever the log has grown since the index was written (or the index is unreadable, or from an older version). Materialized nodes are kept in a bounded LRU cache."""
+
+    VERSION = 3
+
+    def __init__(self, filepath : str, index_filepath : Optional[str] = None, capacity : int = 1024):
+        """Construct a maze index, building the sidecar index file if needed."""
+
+        self.filepath = filepath
+        self.index_filepath = index_filepath if index_filepath is not None else f"{filepath}.index"
+        self.capacity = capacity
+        self.store = ValueStore.for_log(filepath)
+
+        # offset -> (timestamp, branches), kept in least-recently-used order
+        self.cache = OrderedDict()
+
+        if not self.is_current():
+            self.build()
+
+    # Index construction
+
+    def is_current(self) -> bool:
+        """True iff the sidecar index exists and covers the entire log."""
+
+        if not exists(self.index_filepath):
+            return False
+
+        # an index left empty or truncated by an interrupted build is stale, not an error
+        try:
+            trailer = self.trailer()
+        except (ValueError, IndexError):
+            return False
+
+        return trailer.get("version") == self.VERSION and trailer.get("size") == getsize(self.filepath)
+
+    def build(self):
+        """Stream the log once and write the sidecar index.
+
+        The index is written to a temporary file and moved into place once complete, so an interrupted build never leaves a partial index behind."""
+
+        starts = {}
+        templates = TemplateTable()
+
+        # context -> branches in log order: value offsets in the log, and [index position, identifier] pairs for sub-contexts
+        branches = defaultdict(list)
+
+        with open(self.filepath, "rb") as log, open(f"{self.index_filepath}.tmp", "wb") as index:
+            offset = 0
+
+            def write(record, message):
+                position = index.tell()
+                index.write(f"{dumps(record)}\n".encode())
+                branches[message.context].append([position, message.identifier.dump()])
+
+            for line in log:
+                # ignore a partially-written final line; it is picked up on the next rebuild
+                if not line.endswith(b"\n"):
+                    break
+
+                message = templates.resolve(Message.load(loads(line)))
+
+                if isinstance(message, Enter):
+                    starts[message.identifier] = message.timestamp
+
+                if isinstance(message, (Emit, Batch)):
+                    branches[message.context].append(offset)
+
+                if isinstance(message, Exit) and message.identifier in starts:
+                    record = {
+                        "start" : starts.pop(message.identifier),
+                        "stop" : message.timestamp,
+                        "branches" : branches.pop(message.identifier, [])
+                    }
+                    write(record, message)
+
+                # instances are self-contained; keep their shape so they can be expanded without the rest of the log
+                if isinstance(message, Instance):
+                    write({"instance" : offset, "shape" : message.shape}, message)
+
+                offset += len(line)
+
+            # as in `tangle`, contexts whose parent was never entered are roots, while those inside a still-open context and values outside any context are dropped
+            roots = [branch for context, children in branches.items() if context not in starts for branch in children if isinstance(branch, list)]
+            trailer = {"type" : "index", "version" : self.VERSION, "size" : offset, "roots" : roots}
+            index.write(f"{dumps(trailer)}\n".encode())
+
+        replace_file(f"{self.index_filepath}.tmp", self.index_filepath)
+
+    def trailer(self):
+        """Read the trailing summary line of the sidecar index."""
+
+        with open(self.index_filepath, "rb") as index:
+            end = index.seek(0, 2)
+            chunk = 4096
+
+            # grow the window from the end until it holds a complete final line
+            while True:
+                start = max(0, end - chunk)
+                index.seek(start)
+                lines = index.read().splitlines()
+
+                if start == 0 or len(lines) > 1:
+                    return loads(lines[-1])
+
+                chunk *= 2
+
+    # Materialization
+
+    def roots(self) -> Iterable["LazyMaze"]:
+        """Yield a lazy maze for every root context in the log."""
+
+        for position, identifier in self.trailer()["roots"]:
+            yield LazyMaze(self, position, Identifier.load(identifier))
+
+    def materialize(self, position : int) -> Tuple[Timestamp, List[Maze]]:
+        """Return the timestamp and branches of the context recorded at `position` in the index."""
+
+        try:
+            self.cache.move_to_end(position)
+            return self.cache[position]
+        except KeyError:
+            pass
+
+        # files are opened per read, as lazy mazes outlive any particular caller
+        with open(self.index_filepath, "rb") as index:
+            index.seek(position)
+            record = loads(index.readline())
+
+        if "instance" in record:
+            maze = TemplatedMaze(self.load_instance(record["instance"], freeze(record["shape"])))
+            timestamp, branches = maze.value, maze.branches
+        else:
+            timestamp = Timestamp(start=record["start"], stop=record["stop"])
+            branches = []
+            for branch in record["branches"]:
+                if isinstance(branch, int):
+                    branches.extend(self.load_values(branch))
+                else:
+                    child, identifier = branch
+                    branches.append(LazyMaze(self, child, Identifier.load(identifier)))
+
+        self.cache[position] = (timestamp, branches)
+        if len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+
+        return timestamp, branches
+
+    def load_values(self, offset : int) -> List[Maze]:
+        """Load the value-wrapping mazes for the Emit or Batch message at `offset` in the log."""
+
+        message = self.load_message(offset)
+        emits = message.messages() if isinstance(message, Batch) else (message,)
+        return [Maze(identifier=emit.identifier, value=emit.value, branches=[]) for emit in emits]
+
+    def load_instance(self, offset : int, shape) -> Instance:
+        """Load the Instance message at `offset` in the log, resolved to the given shape."""
+
+        return replace(self.load_message(offset), shape=shape)
+
+    def load_message(self, offset : int) -> Message:
+        """Load the message at `offset` in the log, binding any blobs to the log's value store."""
+
+        with open(self.filepath, "rb") as log:
+            log.seek(offset)
+            return self.store.attach(Message.load(loads(log.readline())))
+
+# Lazy mazes defer all work to the index
+
+class LazyMaze(Maze[T]):
+    """Maze whose value and branches are materialized from a `MazeIndex` on first access."""
+
+    __slots__ = ("index", "position")
+
+    def __init__(self, index : MazeIndex, position : int, identifier : Identifier):
+        """Construct a lazy maze for the context recorded at `position` in the index."""
+
+        self.index = index
+        self.position = position
+        self.identifier = identifier
+
+    @property
+    def value(self) -> Timestamp:
+        """The context timestamp."""
+
+        timestamp, _ = self.index.materialize(self.position)
+        return timestamp
+
+    @property
+    def branches(self) -> List[Maze]:
+        """Sub-mazes of the context, in log order."""
+
+        _, branches = self.index.materialize(self.position)
+        return branches
+
+    def __repr__(self):
+        return f"LazyMaze(identifier={self.identifier!r}, position={self.position})"
+
+def load_lazy(filepath : str, index_filepath : Optional[str] = None, capacity : int = 1024) -> Iterable[Maze[Union[Timestamp, Any]]]:
+    """Load a sequence of lazily-materialized Mazes from a message file."""
+
+    index = MazeIndex(filepath, index_filepath=index_filepath, capacity=capacity)
+    yield from index.roots()
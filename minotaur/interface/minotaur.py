@@ -1,62 +1,278 @@
-from ..message import Enter, Exit, Emit
+from ..message import Message, Enter, Exit, Emit, Batch, ValueStore, TemplateWriter
 from ..maze import Identifier
+from .statistics import Statistics
+from .accumulator import Accumulator, ACCUMULATORS
 
 from ..utility.timer import current_time
 
 from logging import Formatter, FileHandler, StreamHandler, getLogger, INFO
 from functools import wraps
-from typing import Optional, Any, Iterable
+from inspect import iscoroutinefunction, isasyncgenfunction, isgeneratorfunction
+from contextvars import ContextVar
+from itertools import count
+from uuid import uuid4
+from os import environ
+from typing import Optional, Any, Iterable, Callable, Mapping, List, Dict
 from sys import stdout
 
+# Process-wide switch; while disabled, contexts and emits are skipped entirely
+
+_ENABLED = environ.get("MINOTAUR_DISABLED", "0") in ("", "0")
+
+def enable():
+    """Enable instrumentation for every Minotaur object in the process."""
+
+    global _ENABLED
+    _ENABLED = True
+
+def disable():
+    """Disable instrumentation for every Minotaur object in the process.
+
+    Should be toggled outside of any open context, as contexts entered while enabled are not exited while disabled. Also set by the `MINOTAUR_DISABLED` environment variable."""
+
+    global _ENABLED
+    _ENABLED = False
+
+def is_enabled() -> bool:
+    """True iff instrumentation is enabled."""
+
+    return _ENABLED
+
+# Generators run in pieces, interleaved with whatever consumes them
+
+class Resumptions:
+    """Runs each resumption of a decorated generator inside the generator's own context.
+
+    The generator keeps its own context stack (and template recording), which is swapped onto the Minotaur object for the duration of every resumption and swapped back out when the generator yields. The context is entered on the first resumption and exited once the generator finishes or is closed; since its duration then spans the time spent suspended too, the time the generator actually spent running is emitted in it as `minotaur:running` just before it exits."""
+
+    __slots__ = ("parent", "start", "kwargs", "state", "entered", "running")
+
+    def __init__(self, parent : "Minotaur", start : Callable[[Mapping[str, Any]], None], kwargs : Mapping[str, Any]):
+        """Construct the resumption state for a single generator invocation."""
+
+        self.parent = parent
+        self.start = start
+        self.kwargs = kwargs
+
+        # (stack, recording) while suspended, and the running time accumulated so far
+        self.state = None
+        self.entered = False
+        self.running = 0.0
+
+    def swap_in(self):
+        """Install the generator's state, entering its context on the first resumption. Returns the tokens restoring the caller's state."""
+
+        parent = self.parent
+
+        if self.state is None:
+            tokens = (parent.stack.set(parent.stack.get()), parent.recording.set(parent.recording.get()))
+            self.entered = True
+            self.start(self.kwargs)
+        else:
+            stack, recording = self.state
+            tokens = (parent.stack.set(stack), parent.recording.set(recording))
+
+        return tokens
+
+    def swap_out(self, tokens, began : float):
+        """Save the generator's state and restore the caller's."""
+
+        parent = self.parent
+        self.running += current_time() - began
+        self.state = (parent.stack.get(), parent.recording.get())
+
+        stack, recording = tokens
+        parent.stack.reset(stack)
+        parent.recording.reset(recording)
+
+    def resume(self, function : Callable, *args):
+        """Call `function` with the generator's state installed."""
+
+        began = current_time()
+        tokens = self.swap_in()
+        try:
+            return function(*args)
+        finally:
+            self.swap_out(tokens, began)
+
+    async def resume_async(self, function : Callable, *args):
+        """Await `function(*args)` with the generator's state installed."""
+
+        began = current_time()
+        tokens = self.swap_in()
+        try:
+            return await function(*args)
+        finally:
+            self.swap_out(tokens, began)
+
+    def exit(self):
+        """Emit the running time and exit the generator's context, if it was ever entered."""
+
+        if self.entered:
+            self.entered = False
+            self.resume(self.leave, self.running)
+
+    def leave(self, running : float):
+        """Emit the generator's running time in its context, then exit it."""
+
+        self.parent.emit("minotaur:running", running)
+        self.parent.exit()
+
 # Context Manager / Decorator associated with a Minotaur interface object
 
 class MinotaurContextManager:
     """Manages a Minotaur context. Conventiently acts as a Python context manager and decorator."""
 
-    def __init__(self, parent : "Minotaur", symbol : str, result : Optional[str] = None, kwargs : Optional[Iterable[str]] = None):
+    def __init__(self, parent : "Minotaur", symbol : str, result : Optional[str] = None, kwargs : Optional[Iterable[str]] = None, template : bool = False):
         """Construct a Minotaur context manager."""
         
         self.parent = parent
         self.symbol = symbol
         self.result = result
-        self.kwargs = list(kwargs) if kwargs is not None else ()
-
-    # Utilities for checking kwargs and results
-
-    def emit_kwargs(self, **kwargs):
-        """Emit `value` with name `key` if `key=value` is given in `**kwargs` and `key` is defined in `self.kwargs`."""
-        for kwarg in self.kwargs:
-            try:
-                value = kwargs[kwarg]
-                self.parent.emit(kwarg, value)
-            except KeyError:
-                pass
-
-    def emit_result(self, value : Any):
-        """Emit the value with name `self.result`, if defined."""
-        if self.result is not None:
-            self.parent.emit(self.result, value)
+        self.kwargs = tuple(kwargs) if kwargs is not None else ()
+        self.template = template
 
     # Context manager interface
 
     def __enter__(self):
-        self.parent.enter(self.symbol)
+        self.parent.enter(self.symbol, template=self.template)
 
     def __exit__(self, *_):
         self.parent.exit()
 
     # Decorator interface
 
+    def plan(self) -> Callable[[Mapping[str, Any]], None]:
+        """Build the function run when a decorated callable is invoked, which enters the context and emits any tracked kwargs."""
+
+        parent, symbol, names, template = self.parent, self.symbol, self.kwargs, self.template
+
+        if not names:
+            def start(kwargs):
+                parent.enter(symbol, template=template)
+        else:
+            def start(kwargs):
+                parent.enter(symbol, template=template)
+                for name in names:
+                    if name in kwargs:
+                        parent.emit(name, kwargs[name])
+
+        return start
+
+    def finish(self) -> Callable[[Any], None]:
+        """Build the function run on the result of a decorated callable, which emits the result if tracked."""
+
+        parent, result = self.parent, self.result
+
+        if result is None:
+            def finish(value):
+                pass
+        else:
+            def finish(value):
+                parent.emit(result, value)
+
+        return finish
+
     def decorate(self, callable):
-        """Decorate a callable with the context manager."""
-
-        @wraps(callable)
-        def wrapper(*args, **kwargs):
-            with self:
-                self.emit_kwargs(**kwargs)
-                result = callable(*args, **kwargs)
-                self.emit_result(result)
-                return result
+        """Decorate a callable with the context manager.
+
+        Coroutine functions, generator functions, and async generator functions are timed over their execution rather than their construction. For generators, the return value is emitted as the result; async generators have no result.
+
+        Generator contexts are only on the context stack while the generator runs (see `Resumptions`): work the consumer does between items is not nested in the context, and the generator's own running time is emitted as `minotaur:running`. While instrumentation is disabled, decorated generator and async generator functions return the undecorated generator."""
+
+        parent, start, finish = self.parent, self.plan(), self.finish()
+
+        if iscoroutinefunction(callable):
+            @wraps(callable)
+            async def wrapper(*args, **kwargs):
+                if not _ENABLED:
+                    return await callable(*args, **kwargs)
+
+                start(kwargs)
+                try:
+                    result = await callable(*args, **kwargs)
+                    finish(result)
+                    return result
+                finally:
+                    parent.exit()
+
+        elif isasyncgenfunction(callable):
+            async def instrumented(args, kwargs):
+                resumptions = Resumptions(parent, start, kwargs)
+
+                # forward sent and thrown values to the wrapped generator
+                generator = callable(*args, **kwargs)
+                try:
+                    item = await resumptions.resume_async(generator.__anext__)
+                    while True:
+                        try:
+                            sent = yield item
+                        except GeneratorExit:
+                            await resumptions.resume_async(generator.aclose)
+                            raise
+                        except BaseException as exception:
+                            item = await resumptions.resume_async(generator.athrow, exception)
+                        else:
+                            item = await resumptions.resume_async(generator.asend, sent)
+                except StopAsyncIteration:
+                    pass
+                finally:
+                    resumptions.exit()
+
+            # while disabled, hand back the unwrapped generator
+            @wraps(callable)
+            def wrapper(*args, **kwargs):
+                if not _ENABLED:
+                    return callable(*args, **kwargs)
+
+                return instrumented(args, kwargs)
+
+        elif isgeneratorfunction(callable):
+            def instrumented(args, kwargs):
+                resumptions = Resumptions(parent, start, kwargs)
+
+                # forward sent and thrown values to the wrapped generator
+                generator = callable(*args, **kwargs)
+                try:
+                    item = resumptions.resume(next, generator)
+                    while True:
+                        try:
+                            sent = yield item
+                        except GeneratorExit:
+                            resumptions.resume(generator.close)
+                            raise
+                        except BaseException as exception:
+                            item = resumptions.resume(generator.throw, exception)
+                        else:
+                            item = resumptions.resume(generator.send, sent)
+                except StopIteration as stop:
+                    resumptions.resume(finish, stop.value)
+                    return stop.value
+                finally:
+                    resumptions.exit()
+
+            # while disabled, hand back the unwrapped generator
+            @wraps(callable)
+            def wrapper(*args, **kwargs):
+                if not _ENABLED:
+                    return callable(*args, **kwargs)
+
+                return instrumented(args, kwargs)
+
+        else:
+            @wraps(callable)
+            def wrapper(*args, **kwargs):
+                if not _ENABLED:
+                    return callable(*args, **kwargs)
+
+                start(kwargs)
+                try:
+                    result = callable(*args, **kwargs)
+                    finish(result)
+                    return result
+                finally:
+                    parent.exit()
+
         return wrapper
 
     def __call__(self, callable):
@@ -67,8 +283,18 @@ class MinotaurContextManager:
 class Minotaur:
     """Interface for managing contexts and logging Message objects."""
     
-    def __init__(self, filepath : Optional[str] = None, verbose : bool = False, root : str = "root"):
-        """Construct a Minotaur object."""
+    def __init__(self,
+        filepath : Optional[str] = None,
+        verbose : bool = False,
+        root : str = "root",
+        value_threshold : Optional[int] = 1 << 16,
+        summary_interval : Optional[float] = None
+    ):
+        """Construct a Minotaur object.
+
+        If `filepath` is provided and `value_threshold` is not `None`, binary values and JSON values larger than `value_threshold` bytes are written to a value store next to the log instead of inline.
+
+        If `summary_interval` is provided, `self.stats()` is emitted as the value `minotaur:stats` at most once every `summary_interval` seconds."""
 
         self.logger = getLogger(f"minotaur.{self}")
         self.logger.setLevel(INFO)
@@ -87,8 +313,32 @@ class Minotaur:
         if verbose:
             self.add_stdout_handler()
 
+        # large and binary values are kept out of the log, when there is a log to sit next to
+        if filepath is not None and value_threshold is not None:
+            self.store = ValueStore.for_log(filepath, threshold=value_threshold)
+        else:
+            self.store = None
+
         # maintain a context stack for appropriately annotating emitted messages
-        self.context_stack = [Identifier(self.root)]
+        # stored as immutable (identifier, rest) pairs so concurrent tasks each see their own stack
+        self.stack = ContextVar(f"minotaur.{self}.stack", default=(Identifier(self.root), None))
+
+        # every message is stamped with our writer id and the next sequence number
+        self.writer = uuid4().hex
+        self.sequence = count()
+
+        # messages inside templated contexts are buffered until the context exits, then written as a single instance
+        self.recording = ContextVar(f"minotaur.{self}.recording", default=None)
+        self.templates = TemplateWriter()
+
+        # accumulators are held per open context and flushed as a single batch when it exits
+        self.accumulators : Dict[Identifier, List[Accumulator]] = {}
+
+        # track the cost of our own instrumentation
+        self.statistics = Statistics()
+        self.summary_interval = summary_interval
+        self.last_summary = current_time()
+        self.summarizing = False
 
     # Handler additions
     
@@ -112,26 +362,120 @@ class Minotaur:
 
     # Special Access Functions
 
+    @property
+    def context_stack(self) -> List[Identifier]:
+        """The identifiers of all open contexts, outermost first."""
+
+        stack, node = [], self.stack.get()
+        while node is not None:
+            identifier, node = node
+            stack.append(identifier)
+        return stack[::-1]
+
     @property
     def current_context(self) -> Identifier:
         """The identifier of the most-recently entered context."""
 
-        return self.context_stack[-1]
+        return self.stack.get()[0]
 
     def pop_context(self) -> Identifier:
         """Return the identifier for the most-recently entered context."""
         
-        return self.context_stack.pop()
+        identifier, rest = self.stack.get()
+        self.stack.set(rest)
+        return identifier
 
     def push_context(self, context : Identifier):
         """Record the most-recently entered context."""
 
-        self.context_stack.append(context)
+        self.stack.set((context, self.stack.get()))
+
+    # Message output
+
+    def write(self, message : Message, start : float, encoded : Optional[Any] = None):
+        """Serialize and log a message, recording the time since `start` as construction overhead.
+
+        `encoded` is the JSON encoding of an Emit's value (or, for a Batch, of each value) if already computed, so values are not serialized twice.
+
+        Inside a templated context, the message is buffered instead; exiting the context writes the whole buffer as one Instance."""
+
+        recording = self.recording.get()
+        if recording is not None:
+            recording.append(message)
+
+            if not (isinstance(message, Exit) and message.identifier == recording[0].identifier):
+                return
+
+            self.recording.set(None)
+            message = self.templates.encode(recording, sequence=next(self.sequence))
+
+        symbol = message.context.symbol if isinstance(message, (Emit, Batch)) else message.identifier.symbol
+        constructed = current_time()
+
+        # skip serialization entirely if nothing would receive the message
+        if not (self.logger.isEnabledFor(INFO) and self.logger.hasHandlers()):
+            self.statistics.drop(symbol, construction=constructed - start)
+            return
+
+        try:
+            line = message.line(encoded) if encoded is not None else str(message)
+        except (TypeError, ValueError):
+            self.statistics.drop(symbol, construction=constructed - start, serialization=current_time() - constructed)
+            raise
+        serialized = current_time()
+
+        self.logger.info(line)
+        written = current_time()
+
+        self.statistics.record(
+            symbol,
+            size=len(line) + 1,
+            construction=constructed - start,
+            serialization=serialized - constructed,
+            writing=written - serialized
+        )
+
+        if self.summary_interval is not None and written - self.last_summary >= self.summary_interval:
+            self.summarize(written)
+
+    def summarize(self, now : float):
+        """Emit `self.stats()` as the value `minotaur:stats`.
+
+        The summary's own message never triggers another summary, and no summary is written into a templated context (which would change its shape); it waits for the next message written outside one."""
+
+        if self.summarizing or self.recording.get() is not None:
+            return
+
+        self.last_summary = now
+        self.summarizing = True
+        try:
+            self.emit("minotaur:stats", self.stats())
+        finally:
+            self.summarizing = False
+
+    def stats(self):
+        """Message counts, bytes written, and time spent constructing, serializing, and writing messages, overall and per symbol.
+
+        Enter and exit messages are attributed to the symbol of the context entered or exited, emits to the symbol of the emitting context."""
+
+        return self.statistics.dump()
+
+    def reset_stats(self):
+        """Zero all instrumentation statistics."""
+
+        self.statistics = Statistics()
 
     # Context manipulation
 
-    def enter(self, symbol : str):
-        """Enter a context with the given symbol."""
+    def enter(self, symbol : str, template : bool = False):
+        """Enter a context with the given symbol.
+
+        If `template` is set, the context and everything inside it is written as a single Instance message when the context exits, sharing its shape with every earlier context of the same structure. Templating is opt-in because the whole subtree is buffered in memory and nothing from it reaches the log until the context exits: `tail` cannot see it while it runs, and a crash loses it. Template small, frequently-repeated contexts (a loop body), not long-running outer ones."""
+
+        if not _ENABLED:
+            return
+
+        start = current_time()
 
         # construct the context identifier
         identifier = Identifier(symbol)
@@ -140,9 +484,15 @@ class Minotaur:
         message = Enter(
             identifier=identifier,
             context=self.current_context,
-            timestamp=current_time()
+            timestamp=current_time(),
+            sequence=next(self.sequence),
+            writer=self.writer
         )
-        self.logger.info(message)
+
+        if template and self.recording.get() is None:
+            self.recording.set([])
+
+        self.write(message, start)
 
         # add the identifier to the context stack
         self.push_context(identifier)
@@ -150,6 +500,16 @@ class Minotaur:
     def exit(self):
         """Exit the current context."""
 
+        if not _ENABLED:
+            return
+
+        # flush the context's accumulators before leaving it
+        accumulators = self.accumulators.pop(self.current_context, None)
+        if accumulators:
+            self.emit_many({accumulator.name : accumulator.value for accumulator in accumulators})
+
+        start = current_time()
+
         # get the exiting context identifier
         identifier = self.pop_context()
 
@@ -157,24 +517,88 @@ class Minotaur:
         message = Exit(
             identifier=identifier,
             context=self.current_context,
-            timestamp=current_time()
+            timestamp=current_time(),
+            sequence=next(self.sequence),
+            writer=self.writer
         )
-        self.logger.info(message)
+        self.write(message, start)
 
     # Value observations
 
     def emit(self, name : str, value : Any):
         """Emit a value in the current context."""
 
+        if not _ENABLED:
+            return
+
+        start = current_time()
         identifier = Identifier(name)
 
+        # measuring a value for the store encodes it, so keep the encoding for the log line
+        encoded = None
+        if self.store is not None:
+            value, encoded = self.store.prepare(value)
+
         message = Emit(
             value=value,
             identifier=identifier,
             context=self.current_context,
-            timestamp=current_time()
+            timestamp=current_time(),
+            sequence=next(self.sequence),
+            writer=self.writer
+        )
+        self.write(message, start, encoded=encoded)
+
+    def emit_many(self, values : Mapping[str, Any]):
+        """Emit several named values in the current context as a single message."""
+
+        if not _ENABLED:
+            return
+
+        start = current_time()
+        identifier = Identifier("minotaur:batch")
+
+        if self.store is not None:
+            prepared, encoded = {}, {}
+            for name, value in values.items():
+                prepared[name], encoded[name] = self.store.prepare(value)
+
+            # splicing only pays off if something was already encoded
+            values = prepared
+            if not any(encoded.values()):
+                encoded = None
+        else:
+            values, encoded = dict(values), None
+
+        message = Batch(
+            values=values,
+            identifier=identifier,
+            context=self.current_context,
+            timestamp=current_time(),
+            sequence=next(self.sequence),
+            writer=self.writer
         )
-        self.logger.info(message)
+        self.write(message, start, encoded=encoded)
+
+    def accumulator(self, name : str, kind : str = "sum") -> Accumulator:
+        """Construct an accumulator in the current context, emitted (along with the context's other accumulators) when the context exits.
+
+        `kind` is one of `counter`, `sum`, `min`, `max`, or `list`. While instrumentation is disabled, the accumulator is never emitted."""
+
+        try:
+            accumulator = ACCUMULATORS[kind](name)
+        except KeyError:
+            raise ValueError(f"Unknown accumulator kind {kind}; expected one of {', '.join(ACCUMULATORS)}.")
+
+        if not _ENABLED:
+            return accumulator
+
+        # the root context is never exited, so there would be nothing to flush on
+        if self.stack.get()[1] is None:
+            raise ValueError(f"Accumulator {name} must be constructed inside a context.")
+
+        self.accumulators.setdefault(self.current_context, []).append(accumulator)
+        return accumulator
 
     def __setitem__(self, name : str, value : Any):
         """Alias for `self.emit(name, value)`."""
@@ -183,12 +607,13 @@ class Minotaur:
 
     # Context manager construction
     
-    def context(self, symbol : str, result : Optional[str] = None, kwargs : Optional[Iterable[str]] = None):
+    def context(self, symbol : str, result : Optional[str] = None, kwargs : Optional[Iterable[str]] = None, template : bool = False):
         return MinotaurContextManager(
             parent=self,
             symbol=symbol,
             result=result,
-            kwargs=kwargs
+            kwargs=kwargs,
+            template=template
         )
 
     def __call__(self, *args, **kwargs):
@@ -0,0 +1,62 @@
+from dataclasses import dataclass, asdict
+from collections import defaultdict
+
+# Counters for the cost of Minotaur's own instrumentation
+
+@dataclass
+class Counters:
+    """Cumulative message counts, output size, and time spent producing messages."""
+
+    messages : int = 0
+    dropped : int = 0
+    bytes : int = 0
+    construction : float = 0.0
+    serialization : float = 0.0
+    writing : float = 0.0
+
+    @property
+    def overhead(self) -> float:
+        """Total time spent in the tracer."""
+
+        return self.construction + self.serialization + self.writing
+
+    def dump(self):
+        """Convert the counters to a JSON encoding."""
+
+        result = asdict(self)
+        result["overhead"] = self.overhead
+        return result
+
+class Statistics:
+    """Overall and per-symbol counters for a Minotaur object."""
+
+    def __init__(self):
+        """Construct an empty set of statistics."""
+
+        self.total = Counters()
+        self.symbols = defaultdict(Counters)
+
+    def record(self, symbol : str, size : int, construction : float, serialization : float, writing : float):
+        """Record a written message, attributed to `symbol`."""
+
+        for counters in (self.total, self.symbols[symbol]):
+            counters.messages += 1
+            counters.bytes += size
+            counters.construction += construction
+            counters.serialization += serialization
+            counters.writing += writing
+
+    def drop(self, symbol : str, construction : float, serialization : float = 0.0):
+        """Record a message that was not written, attributed to `symbol`."""
+
+        for counters in (self.total, self.symbols[symbol]):
+            counters.dropped += 1
+            counters.construction += construction
+            counters.serialization += serialization
+
+    def dump(self):
+        """Convert the statistics to a JSON encoding."""
+
+        result = self.total.dump()
+        result["symbols"] = {symbol : counters.dump() for symbol, counters in self.symbols.items()}
+        return result
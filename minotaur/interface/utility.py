@@ -1,13 +1,15 @@
 from ..maze import Maze
-from ..message import Message, Enter, Exit, Emit, ContextGraph
+from ..message import Message, Enter, Exit, Emit, Batch, Instance, ContextGraph, ValueStore, TemplateTable
 
 from typing import Iterable, List, Union, Any
 from json import loads
 from dataclasses import dataclass
+from collections import defaultdict
+from operator import attrgetter
 
 # Utility Algorithms
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class Timestamp:
     start : float
     stop : float
@@ -16,53 +18,110 @@ class Timestamp:
     def duration(self):
         return self.stop - self.start
 
-def tangle(messages : List[Message]) -> Maze[Union[Timestamp, Any]]:
-    """Load a Maze object from a list of messages.
-    
-    Based on the classic Shunting-Yard algorithm. Runs in O(m) time."""
+def order(messages : Iterable[Message]) -> List[Message]:
+    """Arrange messages in the order they were written.
+
+    Each writer's messages are placed directly at their sequence-number offset, so ordering runs in O(m) time without a comparison sort. Messages from logs predating sequence numbers fall back to timestamp order."""
+
+    writers = defaultdict(list)
+    for message in messages:
+        writers[message.writer].append(message)
+
+    if None in writers:
+        return sorted((message for group in writers.values() for message in group), key=attrgetter("timestamp"))
+
+    result = []
+    for group in writers.values():
+        low = min(message.sequence for message in group)
+        high = max(message.sequence for message in group)
+
+        slots = [None] * (high - low + 1)
+        for message in group:
+            slots[message.sequence - low] = message
+
+        result.extend(message for message in slots if message is not None)
+
+    return result
 
-    stack = []
+def tangle_roots(messages : Iterable[Message]) -> List[Maze[Union[Timestamp, Any]]]:
+    """Load every root Maze from a list of messages.
 
-    for message in sorted(messages):
-        # case 1: emits are converted to value-wrapping mazes and pushed onto the stack
+    Messages are attached to their parent by context identifier rather than by position, so interleaved contexts (e.g. from concurrent tasks) are reconstructed correctly. Roots are the contexts whose parent is never entered; values emitted outside of any context, and contexts never exited, are dropped. Runs in O(m) time."""
+
+    starts = {}
+    branches = defaultdict(list)
+
+    for message in order(messages):
+        # case 1: emits are converted to value-wrapping mazes and attached to their context
         if isinstance(message, Emit):
             maze = Maze(identifier=message.identifier, value=message.value, branches=[])
-            stack.append(maze)
+            branches[message.context].append(maze)
 
-        # case 2: enters are pushed onto the stack as-is
+        # batches are converted to one value-wrapping maze per value
+        if isinstance(message, Batch):
+            for emit in message.messages():
+                branches[message.context].append(Maze(identifier=emit.identifier, value=emit.value, branches=[]))
+
+        # case 2: enters record the start of the context
         if isinstance(message, Enter):
-            stack.append(message)
+            starts[message.identifier] = message.timestamp
+
+        # case 3: instances are complete subtrees, expanded only when their branches are needed
+        if isinstance(message, Instance):
+            branches[message.context].append(TemplatedMaze(message))
 
-        # case 3: exits process all mazes on the stack until the matching enter
+        # case 4: exits build the timestamp-wrapping maze from everything attached so far
         if isinstance(message, Exit):
-            mazes = []
-
-            # search for the matching enter
-            while stack:
-                obj = stack.pop()
-
-                # store mazes
-                if isinstance(obj, Maze):
-                    mazes.append(obj)
-                
-                # and check enters
-                if isinstance(obj, Enter) and obj.identifier == message.identifier:
-
-                    # build the timestamp-wrapping maze and push back to stack
-                    timestamp = Timestamp(start=obj.timestamp, stop=message.timestamp)
-                    maze = Maze(identifier=message.identifier, value=timestamp, branches=mazes)
-                    stack.append(maze)
-
-                    # and make sure we exit the loop
-                    break
-            
-            # if we don't exit...
-            else:
+            try:
+                start = starts.pop(message.identifier)
+            except KeyError:
                 raise Exception(f"No matching enter for identifier {message.identifier}...")
 
-    # if all went well, there's exactly one maze on the stack
-    assert len(stack) == 1
-    return stack[0]
+            timestamp = Timestamp(start=start, stop=message.timestamp)
+            maze = Maze(identifier=message.identifier, value=timestamp, branches=branches.pop(message.identifier, []))
+            branches[message.context].append(maze)
+
+    # anything left attached to a context that was never entered is a root
+    return [maze for context, mazes in branches.items() if context not in starts for maze in mazes if is_context(maze)]
+
+def tangle(messages : List[Message]) -> Maze[Union[Timestamp, Any]]:
+    """Load a Maze object from a list of messages containing exactly one root context."""
+
+    roots = tangle_roots(messages)
+
+    if len(roots) != 1:
+        raise Exception(f"Expected exactly one root context, found {len(roots)}...")
+
+    return roots[0]
+
+class TemplatedMaze(Maze[Timestamp]):
+    """Maze for an Instance message, whose branches are expanded from the instance's shape on first access."""
+
+    __slots__ = ("instance", "expanded")
+
+    def __init__(self, instance : Instance):
+        """Construct a templated maze from a resolved Instance message."""
+
+        self.instance = instance
+        self.identifier = instance.identifier
+        self.expanded = None
+
+    @property
+    def value(self) -> Timestamp:
+        """The context timestamp."""
+
+        return Timestamp(start=self.instance.timestamp, stop=self.instance.stop)
+
+    @property
+    def branches(self) -> List[Maze]:
+        """Sub-mazes of the context."""
+
+        if self.expanded is None:
+            self.expanded = tangle(list(self.instance.messages())).branches
+        return self.expanded
+
+    def __repr__(self):
+        return f"TemplatedMaze(identifier={self.identifier!r}, template={self.instance.template})"
 
 # Utilities associated with the tangling operation above
 
@@ -79,19 +138,24 @@ def is_context(maze : Maze) -> bool:
 # IO Utility
 
 def load_messages(filepath : str) -> Iterable[Message]:
-    """Load a sequence of messages from the indicated filepath."""
+    """Load a sequence of messages from the indicated filepath.
+
+    Out-of-line values are bound to the log's value store and loaded on access, and Instance messages are resolved to their shapes."""
+
+    store = ValueStore.for_log(filepath)
+    templates = TemplateTable()
 
     with open(filepath, "r") as f:
-        for line in f.readlines():
+        for line in f:
             contents = loads(line)
-            yield Message.load(contents)
+            yield templates.resolve(store.attach(Message.load(contents)))
 
 def mazes_from_messages(messages : Iterable[Message]) -> Iterable[Maze]:
     """Convert a sequence of messages to a sequence of Mazes."""
 
     graph = ContextGraph(messages)
     for component in graph.components():
-        yield tangle(component)
+        yield from tangle_roots(component)
 
 def load(filepath : str) -> Iterable[Maze]:
     """Load a sequence of Mazes from a message file."""
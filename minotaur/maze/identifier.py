@@ -1,9 +1,11 @@
 from dataclasses import dataclass
 from typing import Optional
+from functools import lru_cache
+from sys import intern
 
 from ..utility.seed import Seed
 
-@dataclass(eq=True, unsafe_hash=True)
+@dataclass(eq=True, unsafe_hash=True, slots=True)
 class Identifier:
     """Identifiers associate a symbol with a unique key."""
 
@@ -27,10 +29,11 @@ class Identifier:
 
     @classmethod
     def load(cls, json) -> "Identifier":
-        """Construct an identifier from a JSON representation."""
+        """Construct an identifier from a JSON representation.
 
-        symbol, key = json["symbol"], json["key"]
-        return cls(symbol=symbol, key=key)
+        Recently-loaded identifiers are shared, so every message referencing the same context holds the same instance."""
+
+        return _load_identifier(json["symbol"], json["key"])
 
     def dump(self):
         """Convert the instance to a JSON encoding."""
@@ -39,3 +42,10 @@ class Identifier:
             "symbol" : self.symbol,
             "key" : self.key
         }
+
+# identifiers loaded close together tend to share keys (a context and its many children),
+# so a bounded cache shares instances without holding on to every identifier in a log
+
+@lru_cache(maxsize=1 << 16)
+def _load_identifier(symbol : str, key : str) -> Identifier:
+    return Identifier(symbol=intern(symbol), key=key)
@@ -10,7 +10,7 @@ from .path import Node, Path
 
 T = TypeVar("T")
 
-@dataclass
+@dataclass(slots=True)
 class Maze(Generic[T]):
     """Mazes recursively track the relationship between identifiers and polymorphic values."""
 
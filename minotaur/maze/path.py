@@ -5,7 +5,7 @@ from .identifier import Identifier
 
 # nodes
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class Node:
     """Nodes are context-free linearized mazes."""
 
@@ -28,7 +28,7 @@ class Node:
 
 # paths
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class Path:
     """Paths are lists of nodes."""
 
@@ -1,2 +1,4 @@
-from .message import Message, Enter, Exit, Emit
+from .message import Message, Enter, Exit, Emit, Batch, Instance
+from .blob import Blob, ValueStore
+from .template import TemplateWriter, TemplateTable
 from .context_graph import ContextGraph
\ No newline at end of file
@@ -0,0 +1,176 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional, Tuple
+from hashlib import sha256
+from io import BytesIO
+from json import dumps, loads
+from mmap import mmap, ACCESS_READ
+from os import makedirs, replace
+from os.path import join, exists
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Blobs are references to values stored outside of the message log
+
+@dataclass(eq=True, unsafe_hash=True)
+class Blob:
+    """Reference to a content-addressed value held in a `ValueStore`."""
+
+    digest : str
+    format : str
+    size : int
+    store : Optional["ValueStore"] = field(default=None, compare=False, repr=False)
+
+    @property
+    def value(self) -> Any:
+        """Load the referenced value from the bound store."""
+
+        if self.store is None:
+            raise ValueError(f"Blob {self.digest} is not bound to a value store.")
+
+        return self.store.get(self)
+
+    # IO
+
+    @classmethod
+    def load(cls, json) -> "Blob":
+        """Construct a blob reference from a JSON representation."""
+
+        assert json["type"] == "blob"
+        return cls(digest=json["digest"], format=json["format"], size=json["size"])
+
+    def dump(self):
+        """Convert the reference to a JSON encoding."""
+
+        return {
+            "type" : "blob",
+            "digest" : self.digest,
+            "format" : self.format,
+            "size" : self.size
+        }
+
+    @staticmethod
+    def is_blob(json) -> bool:
+        """True iff the JSON value encodes a blob reference."""
+
+        return isinstance(json, dict) and json.get("type") == "blob"
+
+# Value stores live next to the log and hold one file per distinct blob
+
+class ValueStore:
+    """Content-addressed directory of out-of-line values.
+
+    Arrays are written with `numpy.save`, objects supporting the buffer protocol as raw bytes, and JSON values larger than `threshold` bytes as encoded JSON; numpy scalars are kept inline as plain Python values. Loaded values are memory-mapped views of the stored files."""
+
+    EXTENSIONS = {"npy" : "npy", "bytes" : "bin", "json" : "json"}
+
+    def __init__(self, directory : str, threshold : int = 1 << 16):
+        """Construct a value store rooted at `directory`."""
+
+        self.directory = directory
+        self.threshold = threshold
+
+    @classmethod
+    def for_log(cls, filepath : str, **kwargs) -> "ValueStore":
+        """Construct the value store associated with a message log."""
+
+        return cls(f"{filepath}.values", **kwargs)
+
+    def path(self, blob : Blob) -> str:
+        """Location of the file holding the blob contents."""
+
+        return join(self.directory, f"{blob.digest}.{self.EXTENSIONS[blob.format]}")
+
+    # Writing
+
+    def prepare(self, value : Any) -> Tuple[Any, Optional[str]]:
+        """Write the value to the store if it is large or binary, returning what to emit in its place (a `Blob` reference, or the value itself) and, for values kept inline, the JSON encoding computed while measuring them."""
+
+        # numpy scalars are plain numbers (or strings), not buffers
+        if numpy is not None and isinstance(value, numpy.generic):
+            value = value.item()
+
+        if numpy is not None and isinstance(value, numpy.ndarray):
+            if value.dtype.hasobject:
+                return value, None
+
+            buffer = BytesIO()
+            numpy.save(buffer, value, allow_pickle=False)
+            return self.put("npy", buffer.getvalue()), None
+
+        if isinstance(value, (dict, list, str)):
+            # ASCII-escaped, so characters are bytes
+            encoded = dumps(value)
+            if len(encoded) > self.threshold:
+                return self.put("json", encoded.encode()), None
+            return value, encoded
+
+        if value is None or isinstance(value, (bool, int, float)):
+            return value, None
+
+        # anything else supporting the buffer protocol (`bytes`, `array.array`, ...) is stored raw
+        try:
+            contents = memoryview(value).tobytes()
+        except TypeError:
+            return value, None
+
+        return self.put("bytes", contents), None
+
+    def offload(self, value : Any) -> Any:
+        """Write the value to the store if it is large or binary, returning a `Blob` reference in its place."""
+
+        value, _ = self.prepare(value)
+        return value
+
+    def put(self, format : str, contents : bytes) -> Blob:
+        """Write encoded contents to the store, returning a reference to them."""
+
+        blob = Blob(digest=sha256(contents).hexdigest(), format=format, size=len(contents), store=self)
+
+        # identical contents share a single file
+        path = self.path(blob)
+        if not exists(path):
+            makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(contents)
+            replace(f"{path}.tmp", path)
+
+        return blob
+
+    # Reading
+
+    def get(self, blob : Blob) -> Any:
+        """Load a blob's value as a zero-copy, read-only view where the format allows."""
+
+        path = self.path(blob)
+
+        if blob.format == "npy":
+            if numpy is None:
+                raise ImportError(f"Blob {blob.digest} holds an array, but numpy is not installed.")
+            return numpy.load(path, mmap_mode="r", allow_pickle=False)
+
+        if blob.size == 0:
+            contents = memoryview(b"")
+        else:
+            with open(path, "rb") as f:
+                contents = memoryview(mmap(f.fileno(), 0, access=ACCESS_READ))
+
+        if blob.format == "json":
+            return loads(contents.tobytes())
+
+        return contents
+
+    def attach(self, message):
+        """Bind any blobs carried by the message to this store. Returns the message."""
+
+        values = getattr(message, "values", None) or (getattr(message, "value", None),)
+        if isinstance(values, dict):
+            values = values.values()
+
+        for value in values:
+            if isinstance(value, Blob):
+                value.store = self
+
+        return message
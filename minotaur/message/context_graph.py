@@ -4,7 +4,7 @@ from typing import Iterable
 from collections import defaultdict
 
 from ..maze import Identifier
-from .message import Message, Enter, Exit
+from .message import Message, Enter, Exit, Instance
 
 # CONTEXT GRAPH
 
@@ -17,13 +17,13 @@ class ContextGraph:
         """Construct a context graph."""
 
         self.graph = Graph()
-        self.context_map = defaultdict(lambda: set())
+        self.context_map = defaultdict(list)
 
         for message in messages:
-            if isinstance(message, (Enter, Exit)):
+            if isinstance(message, (Enter, Exit, Instance)):
                 self.graph.add_edge(message.identifier, message.context)
             
-            self.context_map[message.context].add(message)
+            self.context_map[message.context].append(message)
 
     def messages(self, *contexts : Identifier) -> Iterable[Message]:
         """Return all messages from the indicated contexts."""
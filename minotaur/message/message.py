@@ -1,20 +1,28 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from abc import ABC, abstractmethod, abstractclassmethod
-from typing import Any
+from typing import Any, Optional, List, Dict, Tuple, Union, Iterable
+from itertools import count
 from json import dumps
 
 from ..maze import Identifier
+from .blob import Blob
 
 # Messages
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class Message(ABC):
-    """Base class for linearization of mazes."""
+    """Base class for linearization of mazes.
+
+    Messages written by a `Minotaur` object carry the object's `writer` id and a per-writer `sequence` number, which totally order that writer's messages."""
 
     identifier : Identifier
     context : Identifier
     timestamp : float
 
+    # keyword-only, so subclass fields keep their positions after `timestamp`
+    sequence : Optional[int] = field(default=None, kw_only=True)
+    writer : Optional[str] = field(default=None, kw_only=True)
+
     # IO
 
     @abstractmethod
@@ -34,12 +42,18 @@ class Message(ABC):
         
         To be used in sub-class instantiations of `dump`."""
 
-        return {
+        result = {
             "identifier" : self.identifier.dump(),
             "context" : self.context.dump(),
             "timestamp" : self.timestamp
         }
 
+        if self.sequence is not None:
+            result["sequence"] = self.sequence
+            result["writer"] = self.writer
+
+        return result
+
     @classmethod
     def load_stub(cls, json):
         """Partially parse the JSON encoding for the message.
@@ -49,7 +63,9 @@ class Message(ABC):
         return {
             "identifier" : Identifier.load(json["identifier"]),
             "context" : Identifier.load(json["context"]),
-            "timestamp" : json["timestamp"]
+            "timestamp" : json["timestamp"],
+            "sequence" : json.get("sequence"),
+            "writer" : json.get("writer")
         }
 
     # magic methods
@@ -58,11 +74,11 @@ class Message(ABC):
         return dumps(self.dump())
 
     def __lt__(self, other):
-        """Uses timestamp-order."""
+        """Uses timestamp-order, breaking ties by sequence number."""
 
-        return self.timestamp <= other.timestamp
+        return (self.timestamp, self.sequence or 0) < (other.timestamp, other.sequence or 0)
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class Enter(Message):
     """Denotes a context has been entered."""
 
@@ -81,7 +97,7 @@ class Enter(Message):
         kwargs = cls.load_stub(json)
         return cls(**kwargs)
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class Exit(Message):
     """Denotes a context has been exited."""
 
@@ -100,7 +116,7 @@ class Exit(Message):
         kwargs = cls.load_stub(json)
         return cls(**kwargs)
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, slots=True)
 class Emit(Message):
     """Denotes a value has been emitted."""
 
@@ -111,18 +127,162 @@ class Emit(Message):
 
         result = self.dump_stub()
         result["type"] = "emit"
-        result["value"] = self.value
+        result["value"] = self.value.dump() if isinstance(self.value, Blob) else self.value
         return result
 
+    def line(self, encoded : str) -> str:
+        """The same string as `str(self)`, given the JSON encoding of the value, which is spliced in rather than serialized again."""
+
+        result = self.dump_stub()
+        result["type"] = "emit"
+        return f'{dumps(result)[:-1]}, "value": {encoded}}}'
+
     @classmethod
     def load(cls, json) -> "Emit":
         """Load an Emit message from a JSON encoding."""
 
         assert json["type"] == "emit"
         kwargs = cls.load_stub(json)
-        value = json["value"]
+        value = Blob.load(json["value"]) if Blob.is_blob(json["value"]) else json["value"]
         return cls(value=value, **kwargs)
 
+@dataclass(eq=True, frozen=True, slots=True)
+class Batch(Message):
+    """Denotes several named values have been emitted at once.
+
+    Equivalent to one Emit per value, each keyed from the batch's key, but written as a single message."""
+
+    values : Dict[str, Any] = field(compare=False)
+
+    def messages(self) -> Iterable[Emit]:
+        """Expand the batch into the Emit messages it encodes."""
+
+        for index, (name, value) in enumerate(self.values.items(), start=1):
+            yield Emit(
+                value=value,
+                identifier=Identifier(name, key=f"{self.identifier.key}.{index}"),
+                context=self.context,
+                timestamp=self.timestamp,
+                sequence=self.sequence,
+                writer=self.writer
+            )
+
+    def dump(self):
+        """Convert a Batch message to a JSON encoding."""
+
+        result = self.dump_stub()
+        result["type"] = "batch"
+        result["values"] = {name : value.dump() if isinstance(value, Blob) else value for name, value in self.values.items()}
+        return result
+
+    def line(self, encoded : Dict[str, Optional[str]]) -> str:
+        """The same string as `str(self)`, given the JSON encodings of the values already computed (or None), which are spliced in rather than serialized again."""
+
+        result = self.dump_stub()
+        result["type"] = "batch"
+
+        values = ", ".join(
+            f"{dumps(name)}: {encoded[name] if encoded.get(name) is not None else dumps(value.dump() if isinstance(value, Blob) else value)}"
+            for name, value in self.values.items()
+        )
+        return f'{dumps(result)[:-1]}, "values": {{{values}}}}}'
+
+    @classmethod
+    def load(cls, json) -> "Batch":
+        """Load a Batch message from a JSON encoding."""
+
+        assert json["type"] == "batch"
+        kwargs = cls.load_stub(json)
+        values = {name : Blob.load(value) if Blob.is_blob(value) else value for name, value in json["values"].items()}
+        return cls(values=values, **kwargs)
+
+# Shapes describe the structure of a context subtree: a context is a (symbol, children) pair and a value is its symbol
+
+Shape = Union[str, Tuple[str, Tuple["Shape", ...]]]
+
+def shape_symbol(shape : Shape) -> str:
+    """The symbol at the top of a shape."""
+
+    return shape if isinstance(shape, str) else shape[0]
+
+def freeze(shape) -> Shape:
+    """Convert a JSON-decoded shape back into hashable tuples."""
+
+    if isinstance(shape, str):
+        return shape
+
+    symbol, children = shape
+    return (symbol, tuple(freeze(child) for child in children))
+
+@dataclass(eq=True, frozen=True, slots=True)
+class Instance(Message):
+    """Denotes a complete context subtree, encoded as a reference to a shared shape plus its timestamps and values.
+
+    Timestamps are listed in pre-order (enter, children, exit) and values in the order they appear. The first instance of each shape written by a writer carries the shape itself; later ones refer to it by `template` alone."""
+
+    template : int = 0
+    timestamps : List[float] = field(default_factory=list, compare=False)
+    values : List[Any] = field(default_factory=list, compare=False)
+    shape : Optional[Shape] = field(default=None, compare=False)
+
+    @property
+    def stop(self) -> float:
+        """Time the subtree's root context was exited."""
+
+        return self.timestamps[-1]
+
+    def messages(self) -> Iterable[Message]:
+        """Expand the instance into the Enter, Emit, and Exit messages it encodes.
+
+        Sub-context and value keys are derived from the root key, so repeated expansions agree."""
+
+        if self.shape is None:
+            raise ValueError(f"Instance of template {self.template} has not been resolved to a shape.")
+
+        timestamps, values = iter(self.timestamps), iter(self.values)
+        keys, sequence = count(1), count()
+
+        def walk(shape : Shape, identifier : Identifier, context : Identifier) -> Iterable[Message]:
+            stamp = {"context" : context, "sequence" : next(sequence), "writer" : self.writer}
+
+            if isinstance(shape, str):
+                yield Emit(value=next(values), identifier=identifier, timestamp=next(timestamps), **stamp)
+                return
+
+            yield Enter(identifier=identifier, timestamp=next(timestamps), **stamp)
+
+            for child in shape[1]:
+                child_identifier = Identifier(shape_symbol(child), key=f"{self.identifier.key}.{next(keys)}")
+                yield from walk(child, child_identifier, identifier)
+
+            yield Exit(identifier=identifier, timestamp=next(timestamps), context=context, sequence=next(sequence), writer=self.writer)
+
+        yield from walk(self.shape, self.identifier, self.context)
+
+    # IO
+
+    def dump(self):
+        """Convert an Instance message to a JSON encoding."""
+
+        result = self.dump_stub()
+        result["type"] = "instance"
+        result["template"] = self.template
+        result["timestamps"] = self.timestamps
+        result["values"] = [value.dump() if isinstance(value, Blob) else value for value in self.values]
+        if self.shape is not None:
+            result["shape"] = self.shape
+        return result
+
+    @classmethod
+    def load(cls, json) -> "Instance":
+        """Load an Instance message from a JSON encoding."""
+
+        assert json["type"] == "instance"
+        kwargs = cls.load_stub(json)
+        values = [Blob.load(value) if Blob.is_blob(value) else value for value in json["values"]]
+        shape = freeze(json["shape"]) if "shape" in json else None
+        return cls(template=json["template"], timestamps=json["timestamps"], values=values, shape=shape, **kwargs)
+
 # monkey patch .load static method for Message
 
 @staticmethod
@@ -136,6 +296,10 @@ def _load_message(json) -> Message:
         return Exit.load(json)
     elif json["type"] == "emit":
         return Emit.load(json)
+    elif json["type"] == "batch":
+        return Batch.load(json)
+    elif json["type"] == "instance":
+        return Instance.load(json)
     else:
         raise TypeError(f"Object {json} does not represent a Message.")
 
@@ -0,0 +1,94 @@
+from dataclasses import replace
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from ..maze import Identifier
+from .message import Message, Enter, Exit, Emit, Batch, Instance, Shape
+
+# Writers assign each distinct shape a template number
+
+class TemplateWriter:
+    """Encodes buffered context subtrees as Instance messages, numbering shapes as they are first seen."""
+
+    def __init__(self):
+        """Construct an empty template writer."""
+
+        self.templates : Dict[Shape, int] = {}
+
+    def encode(self, messages : List[Message], sequence : int) -> Instance:
+        """Encode the messages of a complete subtree (whose final message exits the root) as an Instance."""
+
+        root = messages[-1]
+
+        # attach children to parents by identifier, so interleaved messages still form the right tree
+        children = defaultdict(list)
+        starts, stops, values = {}, {}, {}
+
+        # batches are recorded value by value
+        messages = [expanded for message in messages for expanded in (message.messages() if isinstance(message, Batch) else (message,))]
+
+        for message in messages:
+            if isinstance(message, Enter):
+                starts[message.identifier] = message.timestamp
+                children[message.context].append(message.identifier)
+            elif isinstance(message, Exit):
+                stops[message.identifier] = message.timestamp
+            elif isinstance(message, Emit):
+                values[message.identifier] = message
+                children[message.context].append(message.identifier)
+
+        timestamps, emitted = [], []
+
+        def walk(identifier : Identifier) -> Shape:
+            if identifier in values:
+                timestamps.append(values[identifier].timestamp)
+                emitted.append(values[identifier].value)
+                return identifier.symbol
+
+            timestamps.append(starts[identifier])
+            shape = (identifier.symbol, tuple(walk(child) for child in children[identifier]))
+            timestamps.append(stops[identifier])
+            return shape
+
+        shape = walk(root.identifier)
+
+        try:
+            template, new = self.templates[shape], False
+        except KeyError:
+            template, new = self.templates.setdefault(shape, len(self.templates)), True
+
+        return Instance(
+            identifier=root.identifier,
+            context=root.context,
+            timestamp=starts[root.identifier],
+            sequence=sequence,
+            writer=root.writer,
+            template=template,
+            timestamps=timestamps,
+            values=emitted,
+            shape=shape if new else None
+        )
+
+# Readers remember the shapes each writer has defined
+
+class TemplateTable:
+    """Resolves Instance messages to their shapes while reading a log in order."""
+
+    def __init__(self):
+        """Construct an empty template table."""
+
+        self.shapes : Dict[Tuple[Optional[str], int], Shape] = {}
+
+    def resolve(self, message : Message) -> Message:
+        """Return the message, with its shape filled in if it is an Instance."""
+
+        if not isinstance(message, Instance):
+            return message
+
+        key = (message.writer, message.template)
+
+        if message.shape is not None:
+            self.shapes[key] = message.shape
+            return message
+
+        return replace(message, shape=self.shapes[key])
@@ -1,3 +1,8 @@
 from .cli import cli
 from .symbols import symbols
-from .jsonl import jsonl
\ No newline at end of file
+from .jsonl import jsonl
+from .benchmark import benchmark
+from .tail import tail
+from .index import index
+from .diff import diff
+from .export import export
\ No newline at end of file
@@ -0,0 +1,51 @@
+import click
+from .cli import cli
+
+from ..benchmark import TraceShape, BENCHMARKS, run, save, compare, load_results, footprint
+
+from rich import print
+from rich.table import Table
+
+@cli.command()
+@click.option("-d", "--depth", type=int, default=4, help="Context nesting depth of each synthetic root.")
+@click.option("-f", "--fanout", type=int, default=4, help="Sub-contexts per context.")
+@click.option("-e", "--emits", type=int, default=2, help="Values emitted per context.")
+@click.option("-r", "--roots", type=int, default=8, help="Root contexts in the synthetic trace.")
+@click.option("-n", "--calls", type=int, default=10000, help="Calls per instrumentation-overhead benchmark.")
+@click.option("--repeat", type=int, default=3, help="Runs per benchmark; the fastest is kept.")
+@click.option("-b", "--benchmark", "names", multiple=True, type=click.Choice(list(BENCHMARKS)), help="Benchmark to run. May be repeated; defaults to all.")
+@click.option("-m", "--memory", is_flag=True, help="Also measure the memory footprint of the loaded trace.")
+@click.option("-o", "--output", type=str, help="JSON file to which results are written.")
+@click.option("--baseline", type=str, help="JSON results to compare against.")
+@click.option("-t", "--threshold", type=float, default=0.1, help="Relative slowdown over the baseline reported as a regression.")
+def benchmark(depth, fanout, emits, roots, calls, repeat, names, memory, output, baseline, threshold):
+    """Benchmark instrumentation overhead and analysis throughput."""
+
+    shape = TraceShape(depth=depth, fanout=fanout, emits=emits, roots=roots)
+    results = run(shape, calls=calls, repeat=repeat, names=names or None)
+
+    table = Table(title=f"{shape.size} messages")
+    table.add_column("benchmark")
+    table.add_column("seconds", justify="right")
+    table.add_column("operations", justify="right")
+    table.add_column("μs / operation", justify="right")
+
+    for result in results:
+        table.add_row(result.name, f"{result.seconds:.4f}", str(result.operations), f"{result.per_operation * 1e6:.3f}")
+    print(table)
+
+    measurement = footprint(shape) if memory else None
+    if measurement is not None:
+        print(f"{measurement.nodes} nodes from {measurement.messages} messages retain {measurement.bytes} bytes ({measurement.per_node:.1f} bytes / node)")
+
+    if output:
+        save(results, shape, output, memory=measurement)
+
+    if baseline:
+        regressions = compare(load_results(baseline), results, threshold=threshold)
+
+        for name, slowdown in regressions:
+            print(f"[red]{name}[/red] is {slowdown:.1%} slower than the baseline")
+
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,70 @@
+import click
+from .cli import cli
+
+from ..interface.distribution import Change, summarize, diff as compare
+
+from rich import print
+from rich.table import Table
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+def percent(change : Optional[float]) -> str:
+    """Render a relative change."""
+
+    if change is None:
+        return "new"
+
+    if change == 0:
+        return "±0%"
+
+    color = "red" if change > 0 else "green"
+    return f"[{color}]{change:+.1%}[/{color}]"
+
+def tabulate(changes : List[Change], quantiles) -> Table:
+    """Tabulate the changed paths."""
+
+    table = Table(title=f"Changed paths ({len(changes)})")
+    table.add_column("context")
+    table.add_column("count", justify="right")
+    table.add_column("total", justify="right")
+    table.add_column("Δ total", justify="right")
+    for q in quantiles:
+        table.add_column(f"p{q * 100:g}", justify="right")
+
+    for change in changes:
+        relative = change.relative()
+        row = [
+            "/".join(change.path),
+            f"{change.candidate.count} ({percent(relative['count'])})",
+            f"{change.candidate.total:.4g}s ({percent(relative['total'])})",
+            f"{change.impact:+.4g}s"
+        ]
+
+        for q in quantiles:
+            name = f"p{q * 100:g}"
+            row.append(f"{change.candidate.quantile(q):.4g}s ({percent(relative[name])})")
+
+        table.add_row(*row)
+
+    return table
+
+@cli.command()
+@click.argument("baseline")
+@click.argument("candidate")
+@click.option("-t", "--threshold", type=float, default=0.1, help="Relative change in a count, total, or quantile reported as significant.")
+@click.option("-q", "--quantile", "quantiles", type=float, multiple=True, help="Quantile to compare. May be repeated; defaults to 0.5, 0.9, and 0.99.")
+@click.option("--top", type=int, help="Maximum number of changed paths to display.")
+def diff(baseline, candidate, threshold, quantiles, top):
+    """Compare the per-path durations of a candidate log against a baseline log."""
+
+    quantiles = quantiles or (0.5, 0.9, 0.99)
+
+    # each log is streamed once, in its own process
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        before, after = executor.map(summarize, [baseline, candidate])
+
+    changes = compare(before, after, threshold=threshold, quantiles=quantiles)
+    print(tabulate(changes[:top], quantiles))
+
+    if changes:
+        raise SystemExit(1)
@@ -0,0 +1,128 @@
+import click
+from .cli import cli
+
+from ..maze import Identifier
+from ..message import Message, Enter, Exit, Emit, Batch, Instance, Blob
+from ..interface.utility import load_messages
+
+from json import dumps
+from sys import stdout
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Chrome trace events (also read by Perfetto), converted one message at a time
+
+class ChromeTrace:
+    """Converts a message stream into trace events.
+
+    Each writer becomes a process. Contexts are placed on numbered lanes (threads) so that begin/end events on a lane always nest: a context shares its parent's lane when the parent is the innermost open context there, and otherwise takes the first idle lane. Memory is proportional to the number of open contexts and lanes."""
+
+    def __init__(self):
+        """Construct an empty converter."""
+
+        self.processes : Dict[Optional[str], int] = {}
+
+        # lane stacks per process, and the (process, lane) of every open context
+        self.lanes : Dict[int, List[List[Identifier]]] = {}
+        self.open : Dict[Identifier, Tuple[int, int]] = {}
+
+    def process(self, writer : Optional[str]) -> Iterable[dict]:
+        """Yield the metadata events introducing a writer's process, the first time it is seen."""
+
+        if writer in self.processes:
+            return
+
+        pid = self.processes[writer] = len(self.processes) + 1
+        self.lanes[pid] = []
+        yield {"ph" : "M", "name" : "process_name", "pid" : pid, "args" : {"name" : writer or "minotaur"}}
+
+    def lane(self, pid : int, context : Identifier) -> Tuple[int, Optional[dict]]:
+        """Choose the lane for a context entered inside `context`, returning it along with the metadata event for a new lane (if one was needed)."""
+
+        lanes = self.lanes[pid]
+
+        # continue the parent's lane if nothing else is open on top of it
+        if context in self.open:
+            _, tid = self.open[context]
+            if lanes[tid] and lanes[tid][-1] == context:
+                return tid, None
+
+        for tid, stack in enumerate(lanes):
+            if not stack:
+                return tid, None
+
+        tid = len(lanes)
+        lanes.append([])
+        return tid, {"ph" : "M", "name" : "thread_name", "pid" : pid, "tid" : tid, "args" : {"name" : f"lane {tid}"}}
+
+    def events(self, message : Message) -> Iterable[dict]:
+        """Yield the trace events for a single message."""
+
+        yield from self.process(message.writer)
+        pid = self.processes[message.writer]
+        ts = message.timestamp * 1e6
+
+        if isinstance(message, Enter):
+            tid, metadata = self.lane(pid, message.context)
+            if metadata is not None:
+                yield metadata
+
+            self.lanes[pid][tid].append(message.identifier)
+            self.open[message.identifier] = (pid, tid)
+            yield {"ph" : "B", "name" : message.identifier.symbol, "pid" : pid, "tid" : tid, "ts" : ts, "args" : {"key" : message.identifier.key}}
+
+        elif isinstance(message, Exit):
+            try:
+                pid, tid = self.open.pop(message.identifier)
+            except KeyError:
+                return
+
+            self.lanes[pid][tid].remove(message.identifier)
+            yield {"ph" : "E", "name" : message.identifier.symbol, "pid" : pid, "tid" : tid, "ts" : ts}
+
+        elif isinstance(message, Emit):
+            _, tid = self.open.get(message.context, (pid, 0))
+            yield self.value(message.identifier.symbol, message.value, pid, tid, ts)
+
+        elif isinstance(message, (Batch, Instance)):
+            for expanded in message.messages():
+                yield from self.events(expanded)
+
+    @staticmethod
+    def value(name : str, value : Any, pid : int, tid : int, ts : float) -> dict:
+        """Numbers become counter events, plotted per process; anything else becomes an instant event on the emitting lane."""
+
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return {"ph" : "C", "name" : name, "pid" : pid, "ts" : ts, "args" : {name : value}}
+
+        return {"ph" : "i", "s" : "t", "name" : name, "pid" : pid, "tid" : tid, "ts" : ts, "args" : {"value" : value}}
+
+def dump(messages : Iterable[Message], fp):
+    """Write messages to the provided file pointer as a JSON array of trace events, one event per line."""
+
+    trace = ChromeTrace()
+    separator = "[\n"
+
+    for message in messages:
+        for event in trace.events(message):
+            fp.write(f"{separator}{dumps(event, default=Blob.dump)}")
+            separator = ",\n"
+
+    fp.write("[]\n" if separator == "[\n" else "\n]\n")
+
+@cli.command()
+@click.argument("filepath")
+@click.option("-f", "--format", "format", type=click.Choice(["chrome"]), default="chrome", help="Output format.")
+@click.option("-o", "--output", type=str, help="Output file to which the trace is written.")
+def export(filepath, format, output):
+    """Convert a message log for viewing in other tools.
+
+    The `chrome` format is trace-event JSON, readable by Perfetto and chrome://tracing."""
+
+    messages = load_messages(filepath)
+
+    if output:
+        with open(output, "w") as f:
+            dump(messages, f)
+
+    else:
+        dump(messages, stdout)
@@ -0,0 +1,24 @@
+import click
+from .cli import cli
+
+from ..interface import TraceDatabase
+
+from rich import print
+
+@cli.command()
+@click.argument("filepaths", nargs=-1, required=True)
+@click.option("--db", "database", type=str, default="traces.sqlite", help="SQLite database to which the logs are indexed.")
+@click.option("-b", "--batch", type=int, default=10000, help="Rows staged before each bulk insert.")
+def index(filepaths, database, batch):
+    """Index message logs into a SQLite database for ad-hoc queries.
+
+    Logs already in the database are only read from where the last index stopped."""
+
+    database = TraceDatabase(database)
+
+    try:
+        for filepath in filepaths:
+            count = database.index(filepath, batch=batch)
+            print(f"{filepath}: indexed {count} new messages")
+    finally:
+        database.close()
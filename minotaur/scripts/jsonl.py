@@ -2,6 +2,7 @@ import click
 from .cli import cli
 
 from ..maze import Maze
+from ..message import Blob
 from ..interface import load, is_context, is_value
 
 from json import dumps
@@ -44,7 +45,7 @@ def dump(maze : Maze, fp):
     """Dump the paths of a maze to the provided file pointer."""
 
     for entry in entries(maze):
-        fp.write(f"{dumps(entry)}\n")
+        fp.write(f"{dumps(entry, default=Blob.dump)}\n")
 
 @cli.command()
 @click.argument("filepath")
@@ -1,44 +1,82 @@
 import click
 from .cli import cli
 
-from ..maze import Maze
-from ..interface import load, is_value, is_context
+from ..interface import Hierarchy
+from ..interface.hierarchy import HierarchyNode
+from ..interface.utility import load_messages
 
 from rich import print
 from rich.tree import Tree
+from typing import Optional
+
+def label(node : HierarchyNode, counts : bool = True, timings : bool = True) -> str:
+    """Render the annotated label of a hierarchy node."""
+
+    annotations = []
+
+    if counts:
+        annotations.append(f"×{node.count}")
+
+    if timings:
+        annotations.append(f"total {node.total:.4g}s")
+        annotations.append(f"mean {node.mean:.4g}s")
+
+    return f"{node.symbol} [dim]({', '.join(annotations)})[/dim]" if annotations else node.symbol
 
 def walk(
-    maze : Maze,
+    node : HierarchyNode,
     tree : Tree,
     include_values : bool = False,
+    counts : bool = True,
+    max_depth : Optional[int] = None,
+    top : Optional[int] = None,
+    depth : int = 1,
     value_styling : str = "red",
     context_styling : str = "green"
 ):
-    """Walk a maze, appending to a tree as we do so."""
+    """Walk a hierarchy node, appending its children to a tree as we do so."""
+
+    if max_depth is not None and depth > max_depth:
+        return
 
-    if is_value(maze) and include_values:
-        tree.add(maze.symbol, style=value_styling)
+    if include_values:
+        values = sorted(node.values.values(), key=lambda value: value.count, reverse=True)
+        for value in values[:top]:
+            tree.add(label(value, counts=counts, timings=False), style=value_styling)
 
-    if is_context(maze):
-        tree = tree.add(maze.symbol, style=context_styling)
+    contexts = sorted(node.contexts.values(), key=lambda context: context.total, reverse=True)
+    for context in contexts[:top]:
+        walk(
+            context,
+            tree.add(label(context, counts=counts), style=context_styling),
+            include_values=include_values,
+            counts=counts,
+            max_depth=max_depth,
+            top=top,
+            depth=depth + 1,
+            value_styling=value_styling,
+            context_styling=context_styling
+        )
 
-        for maze in maze.mazes():
-            walk(
-                maze,
-                tree,
-                include_values=include_values,
-                value_styling=value_styling,
-                context_styling=context_styling
-            )
+    # note anything pruned by `top`
+    if top is not None:
+        hidden = max(0, len(contexts) - top)
+        if include_values:
+            hidden += max(0, len(node.values) - top)
+        if hidden:
+            tree.add(f"… {hidden} more", style="dim")
 
 @cli.command()
 @click.argument("filepath")
-@click.option("-c", "--counts", is_flag=True, help="Annotate symbols with their number of occurrences.")
+@click.option("-c/-C", "--counts/--no-counts", default=True, help="Annotate symbols with their number of occurrences.")
 @click.option("-v", "--values", is_flag=True, help="Display value identifiers in the hierarchy.")
-def symbols(filepath, counts, values):
-    """Display the symbol hierarchy."""
+@click.option("-d", "--max-depth", type=int, help="Only display symbols at most this deep.")
+@click.option("-t", "--top", type=int, help="Only display the most expensive symbols at each level.")
+def symbols(filepath, counts, values, max_depth, top):
+    """Display the symbol hierarchy, aggregated over every root in the log."""
+
+    hierarchy = Hierarchy(load_messages(filepath))
 
-    for maze in load(filepath=filepath):
-        tree = Tree(label=filepath)
-        walk(maze, tree, include_values=values)
-        print(tree)
+    tree = Tree(label=filepath)
+    walk(hierarchy.root, tree, include_values=values, counts=counts, max_depth=max_depth, top=top)
+    print(tree)
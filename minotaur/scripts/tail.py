@@ -0,0 +1,112 @@
+import click
+from .cli import cli
+
+from ..interface import Hierarchy, LogFollower
+from ..interface.hierarchy import HierarchyNode
+from ..message import Message
+
+from rich.console import Group
+from rich.live import Live
+from rich.table import Table
+from collections import deque
+from time import sleep
+from typing import Dict
+
+class RollingHierarchy(Hierarchy):
+    """Symbol hierarchy that also keeps the most recent durations of each path."""
+
+    def __init__(self, window : int = 100):
+        """Construct a rolling hierarchy keeping `window` durations per path."""
+
+        super().__init__()
+
+        self.window = window
+        self.recent : Dict[HierarchyNode, deque] = {}
+        self.latest = 0.0
+
+    def update(self, message : Message):
+        # the log's clock is the writer's; track how far it has advanced
+        self.latest = max(self.latest, message.timestamp)
+        super().update(message)
+
+    def record(self, node : HierarchyNode, duration : float):
+        super().record(node, duration)
+
+        try:
+            self.recent[node].append(duration)
+        except KeyError:
+            self.recent[node] = deque([duration], maxlen=self.window)
+
+def in_flight(hierarchy : RollingHierarchy, top : int) -> Table:
+    """Tabulate the longest-running open contexts."""
+
+    table = Table(title=f"In-flight contexts ({len(hierarchy.open)})")
+    table.add_column("context")
+    table.add_column("key")
+    table.add_column("running", justify="right")
+
+    contexts = sorted(hierarchy.open.items(), key=lambda item: item[1][1])
+    for identifier, (node, start) in contexts[:top]:
+        table.add_row("/".join(node.path), identifier.key, f"{hierarchy.latest - start:.3f}s")
+
+    return table
+
+def timings(hierarchy : RollingHierarchy, top : int) -> Table:
+    """Tabulate the completed contexts with the largest total time."""
+
+    table = Table(title=f"Per-symbol timings (last {hierarchy.window} rolling)")
+    table.add_column("context")
+    table.add_column("count", justify="right")
+    table.add_column("total", justify="right")
+    table.add_column("mean", justify="right")
+    table.add_column("rolling mean", justify="right")
+    table.add_column("last", justify="right")
+
+    nodes = sorted(hierarchy.recent, key=lambda node: node.total, reverse=True)
+    for node in nodes[:top]:
+        recent = hierarchy.recent[node]
+        table.add_row(
+            "/".join(node.path),
+            str(node.count),
+            f"{node.total:.4g}s",
+            f"{node.mean:.4g}s",
+            f"{sum(recent) / len(recent):.4g}s",
+            f"{recent[-1]:.4g}s"
+        )
+
+    return table
+
+def render(hierarchy : RollingHierarchy, top : int) -> Group:
+    """Render the live view."""
+
+    return Group(in_flight(hierarchy, top), timings(hierarchy, top))
+
+@cli.command()
+@click.argument("filepath")
+@click.option("-i", "--interval", type=float, default=0.5, help="Seconds between checks for new messages.")
+@click.option("-t", "--top", type=int, default=20, help="Rows displayed per table.")
+@click.option("-w", "--window", type=int, default=100, help="Durations per symbol kept for rolling statistics.")
+def tail(filepath, interval, top, window):
+    """Follow a growing message log, displaying in-flight contexts and rolling per-symbol timings."""
+
+    follower = LogFollower(filepath)
+    hierarchy = RollingHierarchy(window=window)
+
+    with Live(render(hierarchy, top), auto_refresh=False) as live:
+        try:
+            while True:
+                # a shrinking log has been rotated or rewritten, so start over
+                if follower.truncated():
+                    follower.reset()
+                    hierarchy = RollingHierarchy(window=window)
+
+                messages = follower.poll()
+                if messages:
+                    hierarchy.extend(messages)
+                    live.update(render(hierarchy, top), refresh=True)
+
+                # catch up on a backlog without waiting between polls
+                if not follower.lagging():
+                    sleep(interval)
+        except KeyboardInterrupt:
+            pass
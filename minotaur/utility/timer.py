@@ -8,7 +8,7 @@ class Timer:
     def __init__(self):
         """Construct (and start) a timer."""
 
-        self._start, self._stop = None
+        self._start, self._stop = None, None
         self.start()
 
     def start(self) -> 'Timer':
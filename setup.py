@@ -9,12 +9,16 @@ setup(
     author_email="email@cjsmith.io",
     license="MIT",
     packages=find_packages(),
+    python_requires=">=3.10",
     install_requires=[
         "click",
         "hashids",
         "networkx",
         "rich"
     ],
+    extras_require={
+        "numpy" : ["numpy"]
+    },
     zip_safe=False,
     entry_points={
         "console_scripts" : [